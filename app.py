@@ -1,17 +1,21 @@
 import os
-import math
+import time
 import threading
+import multiprocessing
 import customtkinter as ctk
-from datetime import datetime
-import random
-import string
 from tkinter import filedialog, messagebox, Canvas
 
-from PIL import Image, ImageTk
+from PIL import ImageOps, ImageTk
 
-# MoviePy 2.x imports
-# MoviePy 2.x imports
-from moviepy import VideoFileClip, AudioFileClip, CompositeAudioClip, concatenate_audioclips, ColorClip, CompositeVideoClip
+from engine import RenderJob, crop_from_view, render
+from estimate import compare as compare_estimate, describe as describe_estimate, estimate_render, space_warning
+from jobqueue import JobQueue
+from loudness import TARGET_DB
+from media_cache import SourceLoader, nearest_keyframe, ready_proxy, wants_proxy
+from preview import FRAME_BUDGET_MS, FramePyramid, RedrawStats, ViewportRenderer
+from progress import ProgressChannel, ProgressTracker
+
+PROGRESS_POLL_MS = 100 # how often the Tk loop drains render progress
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("dark-blue")
@@ -52,6 +56,23 @@ class VideoClipperApp(ctk.CTk):
         
         # Editor State
         self.original_frame = None 
+        self.frame_size = None # source pixel size the editor works in (proxy frames are stretched to it)
+        self.viewport = None # ViewportRenderer over the frame's pyramid
+        self.source_info = None # cached probe of the loaded video
+        self.loader = SourceLoader()
+        self.loading_future = None
+        self.loading_path = None
+        self.proxy_future = None
+        self.proxy_ready = False # scrub/thumbnail frames come from the source's proxy
+        
+        # Timeline State
+        self.keyframes = None
+        self.keyframes_future = None
+        self.thumb_jobs = [] # [(t, future)]
+        self.thumb_images = {}
+        self.strip_photos = []
+        self.scrub_target = self.scrub_loaded = 0.0
+        self.scrub_future = None
         self.tk_image = None
         self.scale = 1.0
         self.pan_x = 0
@@ -59,19 +80,36 @@ class VideoClipperApp(ctk.CTk):
         self.last_mouse_x = 0
         self.last_mouse_y = 0
         
+        # Redraw Scheduling (see request_redraw)
+        self.canvas_items = None
+        self.redraw_pending = None
+        self.redraw_requested_at = 0.0
+        self.last_redraw_at = 0.0
+        self.redraw_stats = RedrawStats()
+        
         self.show_grid = False
         self.drag_mode = "pan" # "pan", "resize_tl", "resize_tr", "resize_bl", "resize_br"
         
         self.is_processing = False
         self.stop_event = threading.Event()
+        self.abort_time = None
+        self.progress_channel = None
+        self.progress = None
+        self.queue_channel = None # set while a job is being planned for the queue
+        self.close_event = threading.Event() # aborts background analyses when the window closes
         
         self.input_widgets = [] 
         self._combine_layout()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Keyboard Bindings (Global)
         self.bind("<KeyPress>", self.on_key_press)
 
     def on_key_press(self, event):
+        if event.keysym == "F12":
+            # Redraw draw-time and queue-time percentiles (also written to PROCLIP_REDRAW_STATS if set)
+            self.redraw_stats.dump(os.environ.get("PROCLIP_REDRAW_STATS"))
+            return
         # Only active if not entry widget focused? Tkinter handles focus.
         # Check if focusing something else?
         if self.is_processing or not self.original_frame: return
@@ -90,7 +128,7 @@ class VideoClipperApp(ctk.CTk):
         elif event.keysym == "Right": self.pan_x -= step
         else: return # Ignore other keys
         
-        self.draw_canvas()
+        self.request_redraw()
 
     def _combine_layout(self):
         # 2-Column Layout (Inspector | Viewport)
@@ -139,6 +177,14 @@ class VideoClipperApp(ctk.CTk):
         om_audio.pack(fill="x", padx=15, pady=5)
         self.input_widgets.append(om_audio)
 
+        # Loudness Normalization (every clip brought to the same level, measured once per file)
+        self.normalize_var = ctk.StringVar(value="Off")
+        self._create_label("Normalize Loudness:")
+        om_norm = ctk.CTkOptionMenu(self.scroll_frame, variable=self.normalize_var, values=["Off", "On"],
+                                    fg_color=COLOR_ACCENT, button_color="#505050", text_color=COLOR_TEXT)
+        om_norm.pack(fill="x", padx=15, pady=5)
+        self.input_widgets.append(om_norm)
+
         # 3. Clip Logic
         self._add_panel("CLIP PARAMETERS")
         
@@ -186,9 +232,9 @@ class VideoClipperApp(ctk.CTk):
 
         # Sliders
         ctk.CTkLabel(self.custom_ar_frame, text="Scale Limit", font=("Segoe UI", 10), text_color="gray").pack(anchor="w", pady=(5,0))
-        self.slider_w = ctk.CTkSlider(self.custom_ar_frame, from_=0.1, to=1.0, number_of_steps=100, command=lambda v: self.draw_canvas())
+        self.slider_w = ctk.CTkSlider(self.custom_ar_frame, from_=0.1, to=1.0, number_of_steps=100, command=lambda v: self.request_redraw())
         self.slider_w.set(0.8)
-        self.slider_h = ctk.CTkSlider(self.custom_ar_frame, from_=0.1, to=1.0, number_of_steps=100, command=lambda v: self.draw_canvas())
+        self.slider_h = ctk.CTkSlider(self.custom_ar_frame, from_=0.1, to=1.0, number_of_steps=100, command=lambda v: self.request_redraw())
         self.slider_h.set(0.8)
         
         self.slider_w.pack(fill="x", pady=(0,5))
@@ -196,6 +242,14 @@ class VideoClipperApp(ctk.CTk):
         
         self.input_widgets.extend([self.entry_w, self.entry_h, apply_btn, self.slider_w, self.slider_h])
 
+        # Framing (Auto Reframe keeps the crop box size but moves it with the subject, analysed once per video)
+        self.framing_var = ctk.StringVar(value="Manual")
+        ctk.CTkLabel(self.scroll_frame, text="Framing:", font=FONT_LABEL, text_color=COLOR_TEXT_DIM).pack(anchor="w", padx=15, pady=(5, 5))
+        om_framing = ctk.CTkOptionMenu(self.scroll_frame, variable=self.framing_var, values=["Manual", "Auto Reframe"],
+                                       fg_color=COLOR_ACCENT, button_color="#505050", text_color=COLOR_TEXT)
+        om_framing.pack(fill="x", padx=15, pady=5)
+        self.input_widgets.append(om_framing)
+
         # Clip Settings
         self._add_panel("CLIP SETTINGS")
         
@@ -227,6 +281,22 @@ class VideoClipperApp(ctk.CTk):
         self.entry_count.pack(fill="x", pady=2)
         self.input_widgets.append(self.entry_count)
         
+        # Clip Boundaries (Scene Cuts moves starts/ends onto the nearest shot change, analysed once per video)
+        self.boundaries_var = ctk.StringVar(value="Fixed")
+        ctk.CTkLabel(self.scroll_frame, text="Clip Boundaries:", font=FONT_LABEL, text_color=COLOR_TEXT_DIM).pack(anchor="w", padx=15, pady=(5, 5))
+        om_bounds = ctk.CTkOptionMenu(self.scroll_frame, variable=self.boundaries_var, values=["Fixed", "Scene Cuts"],
+                                      fg_color=COLOR_ACCENT, button_color="#505050", text_color=COLOR_TEXT)
+        om_bounds.pack(fill="x", padx=15, pady=5)
+        self.input_widgets.append(om_bounds)
+
+        # Clip Selection (Loudest Moments ranks stretches by audio energy, analysed once per video)
+        self.selection_var = ctk.StringVar(value="In Order")
+        ctk.CTkLabel(self.scroll_frame, text="Clip Selection:", font=FONT_LABEL, text_color=COLOR_TEXT_DIM).pack(anchor="w", padx=15, pady=(5, 5))
+        om_select = ctk.CTkOptionMenu(self.scroll_frame, variable=self.selection_var, values=["In Order", "Loudest Moments"],
+                                      fg_color=COLOR_ACCENT, button_color="#505050", text_color=COLOR_TEXT)
+        om_select.pack(fill="x", padx=15, pady=5)
+        self.input_widgets.append(om_select)
+
         # Export Settings
         self._add_panel("EXPORT SETTINGS")
         
@@ -247,6 +317,41 @@ class VideoClipperApp(ctk.CTk):
                                    fg_color=COLOR_ACCENT, button_color="#505050", text_color=COLOR_TEXT)
         om_fps.pack(fill="x", padx=15, pady=5)
         self.input_widgets.append(om_fps)
+
+        # Encoder (Auto test-encodes a few seconds of the source and keeps the fastest good-looking setting)
+        self.encoder_var = ctk.StringVar(value="Balanced")
+        ctk.CTkLabel(self.scroll_frame, text="Encoder:", font=FONT_LABEL, text_color=COLOR_TEXT_DIM).pack(anchor="w", padx=15, pady=(5, 5))
+        om_encoder = ctk.CTkOptionMenu(self.scroll_frame, variable=self.encoder_var, values=["Fast", "Balanced", "Archival", "Auto"],
+                                       fg_color=COLOR_ACCENT, button_color="#505050", text_color=COLOR_TEXT)
+        om_encoder.pack(fill="x", padx=15, pady=5)
+        self.input_widgets.append(om_encoder)
+
+        # Render Mode (Single Pass decodes the source once for all clips,
+        # Pipelined overlaps decode/resize/encode on threads,
+        # Native runs crop/scale inside ffmpeg without Python compositing)
+        self.render_mode_var = ctk.StringVar(value="Per Clip")
+        ctk.CTkLabel(self.scroll_frame, text="Render Mode:", font=FONT_LABEL, text_color=COLOR_TEXT_DIM).pack(anchor="w", padx=15, pady=(5, 5))
+        om_mode = ctk.CTkOptionMenu(self.scroll_frame, variable=self.render_mode_var, values=["Per Clip", "Pipelined", "Single Pass", "Native (ffmpeg)"],
+                                    fg_color=COLOR_ACCENT, button_color="#505050", text_color=COLOR_TEXT)
+        om_mode.pack(fill="x", padx=15, pady=5)
+        self.input_widgets.append(om_mode)
+
+        # Parallel Export (clips rendered at once in worker processes)
+        self.workers_var = ctk.StringVar(value="Off")
+        ctk.CTkLabel(self.scroll_frame, text="Parallel Clips:", font=FONT_LABEL, text_color=COLOR_TEXT_DIM).pack(anchor="w", padx=15, pady=(5, 5))
+        om_workers = ctk.CTkOptionMenu(self.scroll_frame, variable=self.workers_var, values=["Off", "Auto", "2", "4", "8"],
+                                       fg_color=COLOR_ACCENT, button_color="#505050", text_color=COLOR_TEXT)
+        om_workers.pack(fill="x", padx=15, pady=5)
+        self.input_widgets.append(om_workers)
+
+        # Preview Proxy (low-res copy built in the background for scrubbing and analysis; renders use the original)
+        self.proxy_mode_var = ctk.StringVar(value="Auto")
+        ctk.CTkLabel(self.scroll_frame, text="Preview Proxy:", font=FONT_LABEL, text_color=COLOR_TEXT_DIM).pack(anchor="w", padx=15, pady=(5, 5))
+        om_proxy = ctk.CTkOptionMenu(self.scroll_frame, variable=self.proxy_mode_var, values=["Auto", "Always", "Off"],
+                                     command=lambda choice: self.start_proxy(self.video_path.get()),
+                                     fg_color=COLOR_ACCENT, button_color="#505050", text_color=COLOR_TEXT)
+        om_proxy.pack(fill="x", padx=15, pady=5)
+        self.input_widgets.append(om_proxy)
         
         # --- Footer Actions ---
         footer = ctk.CTkFrame(self.sidebar, fg_color="#252525", corner_radius=0, height=100)
@@ -255,11 +360,22 @@ class VideoClipperApp(ctk.CTk):
         self.status_lbl = ctk.CTkLabel(footer, textvariable=self.status_msg, font=("Consolas", 11), text_color="#00C853", anchor="w")
         self.status_lbl.pack(fill="x", padx=20, pady=(15, 5))
 
+        self.progress_bar = ctk.CTkProgressBar(footer, height=6, progress_color=COLOR_PRIMARY)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(fill="x", padx=20, pady=(0, 2))
+        self.progress_lbl = ctk.CTkLabel(footer, text="", font=("Consolas", 10), text_color=COLOR_TEXT_DIM, anchor="w")
+        self.progress_lbl.pack(fill="x", padx=20, pady=(0, 8))
+
         self.generate_btn = ctk.CTkButton(footer, text="START RENDER", height=45, 
                                           font=("Segoe UI", 14, "bold"), fg_color=COLOR_PRIMARY, hover_color="#0063A5",
                                           corner_radius=4, command=self.start_generation_thread)
         self.generate_btn.pack(fill="x", padx=20, pady=(0, 10))
 
+        queue_btn = ctk.CTkButton(footer, text="ADD TO QUEUE", height=30, 
+                                  fg_color="#404040", hover_color="#505050", corner_radius=4, command=self.add_to_queue)
+        queue_btn.pack(fill="x", padx=20, pady=(0, 10))
+        self.input_widgets.append(queue_btn)
+
         self.stop_btn = ctk.CTkButton(footer, text="ABORT", height=30, 
                                       fg_color="transparent", text_color=COLOR_DANGER, hover_color="#331010", border_width=1, border_color=COLOR_DANGER,
                                       state="disabled", command=self.stop_generation)
@@ -309,12 +425,27 @@ class VideoClipperApp(ctk.CTk):
         self.canvas.bind("<Button-5>", self.on_scroll_zoom)
         self.canvas.bind("<Configure>", self.on_canvas_resize)
 
+        # Timeline (Thumbnail Strip + Scrubber)
+        timeline = ctk.CTkFrame(self.preview_frame, fg_color="#1E1E1E", corner_radius=0)
+        timeline.grid(row=2, column=0, sticky="ew")
+        
+        self.strip = Canvas(timeline, height=48, bg="#101010", highlightthickness=0)
+        self.strip.pack(fill="x", padx=20, pady=(8, 2))
+        self.strip.bind("<Configure>", lambda e: self.draw_strip())
+        self.strip.bind("<ButtonPress-1>", self.on_strip_click)
+        self.strip.bind("<B1-Motion>", self.on_strip_click)
+        
+        self.scrubber = ctk.CTkSlider(timeline, from_=0, to=1, command=self.on_scrub)
+        self.scrubber.set(0)
+        self.scrubber.pack(fill="x", padx=20, pady=(0, 8))
+        self.input_widgets.append(self.scrubber)
+
         # Instruction Overlay
-        ctk.CTkLabel(self.preview_frame, text="SCROLL: Zoom | DRAG: Pan | ARROW: Precise | CORNERS: Resize", font=("Consolas", 10), text_color="#505050").grid(row=2, column=0, pady=5)
+        ctk.CTkLabel(self.preview_frame, text="SCROLL: Zoom | DRAG: Pan | ARROW: Precise | CORNERS: Resize | TIMELINE: Scrub", font=("Consolas", 10), text_color="#505050").grid(row=3, column=0, pady=5)
 
     def toggle_grid(self):
         self.show_grid = not self.show_grid
-        self.draw_canvas()
+        self.request_redraw()
 
     def _add_panel(self, title):
         ctk.CTkLabel(self.scroll_frame, text=title, font=("Segoe UI", 11, "bold"), text_color="#007ACC").pack(anchor="w", padx=15, pady=(20, 5))
@@ -362,19 +493,186 @@ class VideoClipperApp(ctk.CTk):
 
     # --- Canvas Logic ---
     def load_frame(self):
-        if not self.video_path.get(): return
+        path = self.video_path.get()
+        if not path: return
+        # Probe + poster decode run in the background (instant when cached)
+        self.loading_future = self.loader.load(path)
+        self.loading_path = path
+        self.source_info = None
+        self.proxy_ready = False
+        self.thumb_jobs = []
+        self.draw_strip()
+        self.show_placeholder("Loading preview...")
+        self.status_msg.set("Loading source...")
+        self.after(30, self._poll_frame_load)
+
+    def _poll_frame_load(self):
+        future = self.loading_future
+        if future is None: return
+        if not future.done():
+            self.after(30, self._poll_frame_load)
+            return
+        self.loading_future = None
+        self.show_placeholder(None)
+        if self.loading_path != self.video_path.get(): return # superseded
+
         try:
-            # Load video snippet
-            clip = VideoFileClip(self.video_path.get())
-            t = min(5.0, clip.duration / 2)
-            frame = clip.get_frame(t)
-            self.original_frame = Image.fromarray(frame)
-            clip.close()
-            
-            # Reset view
-            self.reset_view()
+            self.source_info, frame = future.result()
         except Exception as e:
+            self.status_msg.set("Ready")
             messagebox.showerror("Error", f"Failed to load video: {e}")
+            return
+
+        # The poster always comes from the original, so it fixes the editor's pixel geometry
+        self.original_frame = frame
+        self.frame_size = frame.size
+        self.viewport = ViewportRenderer(FramePyramid(self.original_frame, self.frame_size))
+        self.status_msg.set("Ready")
+
+        # Reset view
+        self.reset_view()
+        self.start_timeline(self.loading_path)
+        self.start_proxy(self.loading_path)
+
+    # --- Proxy Media ---
+    def start_proxy(self, path):
+        if not path or not self.source_info or path != self.video_path.get(): return
+        self.proxy_ready = ready_proxy(path) is not None
+        if self.proxy_ready or not wants_proxy(self.source_info, self.proxy_mode_var.get().lower()): return
+        future = self.proxy_future = self.loader.proxy(path)
+        self.after(500, lambda: self._poll_proxy(path, future))
+
+    def _poll_proxy(self, path, future):
+        if future is not self.proxy_future: return # superseded by another source's build
+        if not future.done():
+            self.after(500, lambda: self._poll_proxy(path, future))
+            return
+        self.proxy_future = None
+        if path != self.video_path.get(): return # superseded (that build was cancelled)
+        try:
+            future.result()
+        except Exception:
+            return # preview keeps decoding the original
+        self.proxy_ready = True
+        if not self.is_processing:
+            self.status_msg.set("Proxy ready.")
+
+    def on_close(self):
+        # A proxy build or an analysis pass is an ffmpeg child: stop it instead of waiting for it
+        self.close_event.set()
+        self.loader.close()
+        self.destroy()
+
+    # --- Timeline Logic ---
+    def start_timeline(self, path):
+        # Keyframe index + thumbnails come from disk when this source was opened before
+        info = self.source_info
+        self.keyframes = None
+        self.keyframes_future = self.loader.keyframes(path, info)
+        self.thumb_jobs = self.loader.thumbnails(path, info)
+        self.thumb_images = {}
+        self.scrub_target = self.scrub_loaded = min(5.0, info["duration"] / 2)
+        self.scrub_future = None
+        self.scrubber.configure(to=info["duration"])
+        self.scrubber.set(self.scrub_target)
+        self.draw_strip()
+        self.after(100, lambda: self._poll_timeline(path))
+
+    def _poll_timeline(self, path):
+        if path != self.video_path.get(): return # superseded
+        pending = False
+        
+        if self.keyframes_future is not None:
+            if self.keyframes_future.done():
+                try: self.keyframes = self.keyframes_future.result()
+                except Exception: self.keyframes = None # scrub at exact times instead
+                self.keyframes_future = None
+            else:
+                pending = True
+        
+        changed = False
+        for i, (t, fut) in enumerate(self.thumb_jobs):
+            if i in self.thumb_images: continue
+            if not fut.done():
+                pending = True
+                continue
+            try: self.thumb_images[i] = fut.result()
+            except Exception: self.thumb_images[i] = None
+            changed = True
+        
+        if changed: self.draw_strip()
+        if pending: self.after(100, lambda: self._poll_timeline(path))
+
+    def draw_strip(self):
+        self.strip.delete("all")
+        if not self.source_info: return
+        w = self.strip.winfo_width()
+        h = self.strip.winfo_height()
+        n = len(self.thumb_jobs)
+        self.strip_photos = []
+        for i in range(n):
+            img = self.thumb_images.get(i)
+            if img is None: continue
+            x0 = int(i * w / n)
+            x1 = int((i + 1) * w / n)
+            if x1 <= x0: continue
+            photo = ImageTk.PhotoImage(ImageOps.fit(img, (x1 - x0, h)))
+            self.strip_photos.append(photo)
+            self.strip.create_image(x0, 0, image=photo, anchor="nw")
+        self.strip.create_line(0, 0, 0, h, fill="#00FF00", width=2, tags="marker")
+        self.move_strip_marker()
+
+    def move_strip_marker(self):
+        if not self.source_info: return
+        x = self.scrubber.get() / self.source_info["duration"] * self.strip.winfo_width()
+        self.strip.coords("marker", x, 0, x, self.strip.winfo_height())
+
+    def on_strip_click(self, event):
+        if self.is_processing or not self.source_info: return
+        w = max(1, self.strip.winfo_width())
+        t = min(max(0.0, event.x / w), 1.0) * self.source_info["duration"]
+        self.scrubber.set(t)
+        self.on_scrub(t)
+
+    def on_scrub(self, value):
+        if self.is_processing or not self.source_info or self.loading_future is not None: return
+        self.move_strip_marker()
+        # Snap to the nearest keyframe: decoding there starts immediately (every proxy frame is close to one)
+        self.scrub_target = float(value) if self.proxy_ready else nearest_keyframe(self.keyframes, float(value))
+        if self.scrub_future is None and self.scrub_target != self.scrub_loaded:
+            self._load_scrub_frame()
+
+    def _load_scrub_frame(self):
+        path = self.video_path.get()
+        t = self.scrub_target
+        future = self.scrub_future = self.loader.frame_at(path, t)
+        self.after(15, lambda: self._poll_scrub(path, t, future))
+
+    def _poll_scrub(self, path, t, future):
+        if future is not self.scrub_future: return # start_timeline reset the scrubber meanwhile
+        if not future.done():
+            self.after(15, lambda: self._poll_scrub(path, t, future))
+            return
+        self.scrub_future = None
+        if path != self.video_path.get(): return
+        try:
+            frame = future.result()
+        except Exception:
+            return
+        # Drawn at the source size (also for proxy frames), so the crop geometry and view stay valid
+        self.scrub_loaded = t
+        self.original_frame = frame
+        self.viewport = ViewportRenderer(FramePyramid(frame, self.frame_size))
+        self.request_redraw()
+        # Only the latest position matters; skip everything scrubbed past meanwhile
+        if self.scrub_target != t:
+            self._load_scrub_frame()
+
+    def show_placeholder(self, text):
+        self.canvas.delete("placeholder")
+        if text:
+            self.canvas.create_text(self.canvas.winfo_width() // 2, self.canvas.winfo_height() // 2, text=text,
+                                    fill=COLOR_TEXT_DIM, font=("Segoe UI", 12), tags="placeholder")
 
     def update_from_entry(self, event=None):
         if not self.original_frame: return
@@ -383,7 +681,7 @@ class VideoClipperApp(ctk.CTk):
             target_h = int(self.var_crop_h.get())
             
             # Constraints
-            iw, ih = self.original_frame.size
+            iw, ih = self.frame_size
             target_w = min(iw, max(10, target_w))
             target_h = min(ih, max(10, target_h))
             
@@ -406,7 +704,7 @@ class VideoClipperApp(ctk.CTk):
             self.var_crop_w.set(str(target_w))
             self.var_crop_h.set(str(target_h))
             
-            self.draw_canvas()
+            self.request_redraw()
             self.sidebar.focus_set() # Clear focus from entry
             
         except ValueError: pass
@@ -416,14 +714,14 @@ class VideoClipperApp(ctk.CTk):
             self.custom_ar_frame.pack(fill="x", padx=15, pady=5)
             # Init values from current box if possible
             if self.original_frame:
-                iw, ih = self.original_frame.size
+                iw, ih = self.frame_size
                 # If values empty
                 if not self.var_crop_w.get():
                      self.var_crop_w.set(str(int(iw * 0.8)))
                      self.var_crop_h.set(str(int(ih * 0.8)))
         else:
             self.custom_ar_frame.pack_forget()
-        self.draw_canvas()
+        self.request_redraw()
 
     def reset_view(self, fit_mode="w"):
         if self.is_processing: return
@@ -433,7 +731,7 @@ class VideoClipperApp(ctk.CTk):
         
         cw = self.canvas.winfo_width()
         ch = self.canvas.winfo_height()
-        iw, ih = self.original_frame.size
+        iw, ih = self.frame_size
         
         # Calculate Box Sizes first
         ar = self.get_aspect_ratio()
@@ -461,17 +759,17 @@ class VideoClipperApp(ctk.CTk):
         else:
             self.scale = box_h / ih
         
-        self.draw_canvas()
+        self.request_redraw()
 
     def zoom_in(self):
         if self.is_processing: return
         self.scale *= 1.02
-        self.draw_canvas()
+        self.request_redraw()
     
     def zoom_out(self):
         if self.is_processing: return
         self.scale *= 0.98
-        self.draw_canvas()
+        self.request_redraw()
 
     def on_scroll_zoom(self, event):
         if self.is_processing: return
@@ -493,14 +791,47 @@ class VideoClipperApp(ctk.CTk):
         self.pan_y += dy
         self.last_mouse_x = event.x
         self.last_mouse_y = event.y
-        self.draw_canvas()
+        self.request_redraw()
 
     def on_canvas_resize(self, event):
+        self.request_redraw()
+
+    def request_redraw(self):
+        # Coalesce bursts of events (drag, wheel, keys, resize) into at most one redraw per display frame
+        if self.redraw_pending is not None:
+            self.redraw_stats.coalesced += 1
+            return
+        self.redraw_requested_at = self.redraw_stats.timer()
+        since_last = (self.redraw_requested_at - self.last_redraw_at) * 1000
+        delay = max(0, int(FRAME_BUDGET_MS - since_last))
+        self.redraw_pending = self.after(delay, self._run_redraw)
+
+    def _run_redraw(self):
+        self.redraw_pending = None
+        started = self.redraw_stats.timer()
         self.draw_canvas()
+        self.last_redraw_at = self.redraw_stats.timer()
+        self.redraw_stats.record(started, self.redraw_requested_at)
+
+    def flush_redraw(self):
+        # Make sure state derived in draw_canvas (box size) is current
+        if self.redraw_pending is not None:
+            self.after_cancel(self.redraw_pending)
+            self._run_redraw()
+
+    def _canvas_items(self):
+        # Retained mode: items are created once and only moved afterwards
+        if not self.canvas_items:
+            self.canvas_items = {
+                "image": self.canvas.create_image(0, 0, anchor="nw"),
+                "dim": [self.canvas.create_rectangle(0, 0, 0, 0, fill="#000000", stipple="gray50", outline="") for _ in range(4)],
+                "box": self.canvas.create_rectangle(0, 0, 0, 0, outline="#00FF00", width=3),
+            }
+        return self.canvas_items
 
     def draw_canvas(self):
         if not self.original_frame: return
-        self.canvas.delete("all")
+        items = self._canvas_items()
         
         cw = self.canvas.winfo_width()
         ch = self.canvas.winfo_height()
@@ -508,7 +839,7 @@ class VideoClipperApp(ctk.CTk):
         cy = ch // 2
         
         # 1. Draw Image
-        iw, ih = self.original_frame.size
+        iw, ih = self.frame_size
         new_w = int(iw * self.scale)
         new_h = int(ih * self.scale)
         
@@ -519,9 +850,14 @@ class VideoClipperApp(ctk.CTk):
         tl_y = int(img_cy - new_h // 2)
         
         try:
-            pil_img = self.original_frame.resize((new_w, new_h), Image.Resampling.BILINEAR)
-            self.tk_image = ImageTk.PhotoImage(pil_img)
-            self.canvas.create_image(tl_x, tl_y, image=self.tk_image, anchor="nw")
+            # Only the visible part, resampled from the nearest pyramid level
+            rendered = self.viewport.render(self.scale, cw, ch, tl_x, tl_y)
+            if rendered:
+                self.tk_image, vx, vy = rendered
+                self.canvas.coords(items["image"], vx, vy)
+                self.canvas.itemconfigure(items["image"], image=self.tk_image, state="normal")
+            else:
+                self.canvas.itemconfigure(items["image"], state="hidden")
         except Exception: pass
 
         # 2. Draw Crop Overlay (Fixed at Center)
@@ -555,15 +891,13 @@ class VideoClipperApp(ctk.CTk):
         by2 = cy + box_h/2
         
         # Dimming
-        dim_color = "#000000"
-        stipple = "gray50" 
-        
-        self.canvas.create_rectangle(0, 0, cw, by1, fill=dim_color, stipple=stipple, outline="")
-        self.canvas.create_rectangle(0, by2, cw, ch, fill=dim_color, stipple=stipple, outline="")
-        self.canvas.create_rectangle(0, by1, bx1, by2, fill=dim_color, stipple=stipple, outline="")
-        self.canvas.create_rectangle(bx2, by1, cw, by2, fill=dim_color, stipple=stipple, outline="")
+        dim = items["dim"]
+        self.canvas.coords(dim[0], 0, 0, cw, by1)
+        self.canvas.coords(dim[1], 0, by2, cw, ch)
+        self.canvas.coords(dim[2], 0, by1, bx1, by2)
+        self.canvas.coords(dim[3], bx2, by1, cw, by2)
         
-        self.canvas.create_rectangle(bx1, by1, bx2, by2, outline="#00FF00", width=3)
+        self.canvas.coords(items["box"], bx1, by1, bx2, by2)
         
     def get_aspect_ratio(self):
         mode = self.aspect_ratio_mode.get()
@@ -574,7 +908,7 @@ class VideoClipperApp(ctk.CTk):
         if "4:5" in mode: return 4/5
         # Original or Free
         if self.original_frame:
-            w, h = self.original_frame.size
+            w, h = self.frame_size
             return w/h
         return 16/9
 
@@ -596,327 +930,238 @@ class VideoClipperApp(ctk.CTk):
     # --- Generation Logic ---
     def stop_generation(self):
         if self.is_processing:
+            self.abort_time = time.perf_counter()
             self.stop_event.set()
             self.status_msg.set("Stopping...")
 
-    def start_generation_thread(self):
-        if self.is_processing: return
+    def validate_inputs(self):
         if not self.video_path.get() or not self.output_path.get():
             messagebox.showerror("Error", "Select Video and Output Folder.")
-            return
+            return False
+        if self.loading_future is not None or not self.original_frame:
+            messagebox.showerror("Error", "Video is still loading.")
+            return False
         
         try:
             dur = float(self.clip_duration.get())
             if dur <= 0: raise ValueError
         except:
             messagebox.showerror("Error", "Invalid Duration.")
-            return
+            return False
+        return True
+
+    def start_generation_thread(self):
+        if self.is_processing: return
+        if not self.validate_inputs(): return
 
+        self.flush_redraw()
+        try:
+            job, options = self.build_job(), self.render_options()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
         self.is_processing = True
         self.stop_event.clear()
         
         self.toggle_inputs(False)
-        self.generate_btn.configure(text="RENDERING...")
-        self.stop_btn.configure(state="normal")
-        self.status_msg.set("Initializing Render Engine...")
-        
-        threading.Thread(target=self.generate_clips, daemon=True).start()
-
-    def generate_clips(self):
+        self.generate_btn.configure(text="ESTIMATING...")
+        self.stop_btn.configure(state="normal") # the estimate may run analyses and encoder tuning first
+        self.status_msg.set("Estimating render cost...")
+        self.progress_bar.set(0)
+        self.progress_lbl.configure(text="")
+
+        # The estimate (and any analysis the clip plan needs) runs off the Tk thread; the user
+        # sees it, and a disk space warning, before anything is rendered
+        self.progress_channel = ProgressChannel()
+        self.progress = ProgressTracker()
+        threading.Thread(target=self.estimate_clips, args=(job, options, self.progress_channel), daemon=True).start()
+        self.after(PROGRESS_POLL_MS, lambda: self._poll_estimate(job, options))
+
+    def estimate_clips(self, job, options, channel):
+        # Estimate thread: no Tk calls in here
         try:
-            # 1. Calculate Crop Geometry
-            # Relative to Original Image
-            # We displayed image at (img_cx, img_cy) with size (new_w, new_h)
-            # Crop Box was at (cx, cy) with size (box_w, box_h)
-            
-            # Center of canvas
-            cw = self.canvas.winfo_width()
-            ch = self.canvas.winfo_height()
-            cx = cw / 2
-            cy = ch / 2
-            
-            # Where is the image top-left?
-            iw, ih = self.original_frame.size
-            current_w = iw * self.scale
-            current_h = ih * self.scale
-            
-            img_cx = cx + self.pan_x
-            img_cy = cy + self.pan_y
-            
-            img_tl_x = img_cx - current_w / 2
-            img_tl_y = img_cy - current_h / 2
-            
-            # Where is box top-left?
-            box_tl_x = cx - self.box_w / 2
-            box_tl_y = cy - self.box_h / 2
-            
-            # Intersection (Relative to Image TL)
-            crop_x_display = box_tl_x - img_tl_x
-            crop_y_display = box_tl_y - img_tl_y
-            
-            # Convert to Original Scale
-            # real_x = display_x / scale
-            real_x = crop_x_display / self.scale
-            real_y = crop_y_display / self.scale
-            real_w = self.box_w / self.scale
-            real_h = self.box_h / self.scale
-            
-            print(f"Crop: x={real_x}, y={real_y}, w={real_w}, h={real_h}")
-            
-            # Proceed with MoviePy
-            video_path = self.video_path.get()
-            output_dir = self.output_path.get()
-            audio_path = self.audio_path.get()
-            dur = float(self.clip_duration.get())
-            
-            video = VideoFileClip(video_path)
-            
-            # Audio Prep
-            bg_audio = None
-            if self.audio_mode.get() in ["mix", "background"] and audio_path:
-                try:
-                    bg_audio = AudioFileClip(audio_path)
-                except: pass
-
-            # Smart Clip Logic
-            # 1. If video is shorter than duration, loop it.
-            if video.duration < dur:
-                # Calculate how many times we need to loop
-                # Example: Vid=10s, Dur=60s. Need 6 loops.
-                repeats = math.ceil(dur / video.duration)
-                # Concatenate
-                # Note: concatenate_videoclips might be heavy for memory if video is large.
-                # But for shorter clips it's okay.
-                # Use compose method to avoid glitches? method="compose"
-                from moviepy import concatenate_videoclips
-                video_looped = concatenate_videoclips([video] * repeats)
-                # Now crop/cut to exact dur
-                # We replace 'video' with this looped version effectively for this clip?
-                # Actually, if video < dur, we probably only want 1 clip of length 'dur'.
-                # So we treat this as the source.
-                video = video_looped
-                # Re-calculate limits?
-                # If we simply loop, video.duration increases.
-                # start=0, end=dur.
-            
-            max_clips_possible = math.floor(video.duration / dur)
-            # If after looping, we have enough for 1 clip?
-            
-            count_mode = self.clip_count_mode.get()
-            requested_count = int(self.custom_clip_count.get()) if count_mode == "Custom" else max_clips_possible
-            
-            # If automatic, we usually take max_clips_possible.
-            # If custom, we try to get 'requested_count'.
-            # If video is long enough for N clips, take them.
-            # If remainder exists?
-            
-            total = requested_count
-            # Safety cap?
-            if count_mode == "Automatic":
-                total = max_clips_possible
-                # If remainder is significant? User didn't ask.
-            
-            if total < 1: total = 1 # At least one
+            channel.post("estimated", estimate=estimate_render(job, status=channel.status, stop_event=self.stop_event,
+                                                               **options))
+        except Exception as e:
+            # Only a forecast; never keep the render from starting
+            channel.post("estimated", estimate=None, error=str(e) or type(e).__name__)
+
+    def _poll_estimate(self, job, options):
+        result = None
+        for kind, data in self.progress_channel.drain():
+            if kind == "status":
+                self.status_msg.set(data["text"])
+            elif kind == "estimated":
+                result = data
+        if result is None:
+            self.after(PROGRESS_POLL_MS, lambda: self._poll_estimate(job, options))
+            return
+        if self.stop_event.is_set():
+            self.is_processing = False
+            self.toggle_inputs(True)
+            self.generate_btn.configure(text="START RENDER")
+            self.stop_btn.configure(state="disabled")
+            self.status_msg.set("Stopped.")
+            return
 
-            ar_name = self.aspect_ratio_mode.get().split(" ")[0].replace(":", "-")
-            video_name = os.path.splitext(os.path.basename(video_path))[0]
-            
-            # Audio Cache Initialization
-            bg_cache = {}
-            
-            # Export Settings
-            resolution_mode = self.quality_var.get()
-            fps_choice = self.fps_var.get()
-            
-            # Map quality to settings
-            bitrate = "8000k" # default high
-            preset = "medium" # default medium
-            target_res_val = None 
-            
-            if resolution_mode != "Original":
-                if "4k" in resolution_mode: 
-                    target_res_val = 2160
-                    bitrate = "20000k"
-                elif "1080p" in resolution_mode:
-                    target_res_val = 1080
-                    bitrate = "8000k"
-                elif "720p" in resolution_mode:
-                    target_res_val = 720
-                    bitrate = "4000k"
-                elif "480p" in resolution_mode:
-                    target_res_val = 480
-                    bitrate = "2500k"
-                elif "360p" in resolution_mode:
-                    target_res_val = 360
-                    bitrate = "1000k"
-                elif "240p" in resolution_mode:
-                    target_res_val = 240
-                    bitrate = "500k"
-                elif "144p" in resolution_mode:
-                    target_res_val = 144
-                    bitrate = "300k"
-
-            out_fps = video.fps
-            if fps_choice != "Source":
-                out_fps = float(fps_choice)
-
-            for i in range(total):
-                if self.stop_event.is_set(): break
-                self.status_msg.set(f"Exporting Clip {i+1}/{total}...")
-                
-                # Calculate Time Range
-                start = i * dur
-                end = start + dur
-                
-                # Check overflow
-                if end > video.duration:
-                    # Strategy: Backtrack
-                    # If we need a clip of 'dur' length ending at video.duration:
-                    start = max(0, video.duration - dur)
-                    end = video.duration
-                    
-                    # If even that is not enough (shouldn't happen if we looped short video),
-                    # but if video > dur but < (i+1)*dur...
-                    # Wait, if `count` is high, we might run out of video completely even with backtracking?
-                    # "Backtrack" only makes sense for the *last partial segment*.
-                    # If we simply requested 100 clips from 1min video, we'd just get duplicates of the end?
-                    # Let's assume we stop if start < previous_end?
-                    # User said: "duplicate the video cut it and complete the desired duration" context was for short video.
-                    # For end of video: "grab 10 sec from back".
-                    # This implies valid overlap.
-                    
-                    # If start < 0 (should use loop logic ideally, but handled above), set to 0.
-                
-                clip = video.subclipped(start, end)
-                
-                # Check bounds
-                if not self.aspect_ratio_mode.get().startswith("Original"):
-                    # New Composite Logic:
-                    # 1. Output Size = real_w x real_h
-                    # 2. Video Size = video.w x video.h
-                    # 3. Video Position checks:
-                    #    x1, y1 are the top-left of the BOX relative to VIDEO.
-                    #    If x1 < 0, it means Box starts BEFORE Video (Video starts straight or shifted right in box).
-                    #    Wait, `real_x` = box_tl - img_tl (all scaled to real).
-                    #    If box is over image, real_x > 0.
-                    #    If box is to the left of image (padding left), real_x < 0.
-                    #    
-                    #    We want to place the Video onto the Black Box.
-                    #    Box is (0, 0) to (w, h) in Output coord system.
-                    #    Video top-left in Output system?
-                    #    If real_x = 100 (Box starts 100px inside video), then Video top-left is at -100 in Box system.
-                    #    So pos = (-real_x, -real_y).
-                    
-                    bg_w = int(real_w)
-                    bg_h = int(real_h)
-                    
-                    # Force Even Dimensions (Required by libx264)
-                    if bg_w % 2 != 0: bg_w -= 1
-                    if bg_h % 2 != 0: bg_h -= 1
-                    
-                    if bg_w > 0 and bg_h > 0:
-                        # Background
-                        bg = ColorClip(size=(bg_w, bg_h), color=(0,0,0), duration=clip.duration)
-                        
-                        # Foreground Video Position
-                        vid_pos = (-int(real_x), -int(real_y))
-                        
-                        clip = CompositeVideoClip([bg, clip.with_position(vid_pos)], size=(bg_w, bg_h))
-                
-                # Resolution Resize (Restored & Fixed)
-                if target_res_val is not None:
-                    curr_w, curr_h = clip.size
-                    
-                    if curr_w >= curr_h:
-                        # Landscape: Set Height
-                        clip = clip.resized(height=target_res_val)
-                    else:
-                        # Portrait: Set Width
-                        clip = clip.resized(width=target_res_val)
-                    
-                    # Ensure final resized dimensions are even
-                    rw, rh = clip.size
-                    new_rw = int(rw) if int(rw) % 2 == 0 else int(rw) - 1
-                    new_rh = int(rh) if int(rh) % 2 == 0 else int(rh) - 1
-                    
-                    if new_rw != int(rw) or new_rh != int(rh):
-                        clip = clip.cropped(width=new_rw, height=new_rh, x_center=rw/2, y_center=rh/2)
-                
-                # Audio
-                final_audio = None
-                if bg_audio:
-                     # Check cache
-                     if dur not in bg_cache:
-                         if bg_audio.duration < dur:
-                             n = math.ceil(dur / bg_audio.duration)
-                             bg_cache[dur] = concatenate_audioclips([bg_audio]*n).subclipped(0, dur)
-                         else:
-                             bg_cache[dur] = bg_audio.subclipped(0, dur)
-                     
-                     bg_seg = bg_cache[dur]
-                     
-                     if self.audio_mode.get() == "background":
-                         final_audio = bg_seg
-                     elif self.audio_mode.get() == "mix":
-                         final_audio = CompositeAudioClip([clip.audio, bg_seg]) if clip.audio else bg_seg
-                
-                if final_audio:
-                    clip = clip.with_audio(final_audio)
-                elif self.audio_mode.get() == "original":
-                    pass # Keep orig
-
-
-
-                # Filename format: DDMMYYYYHHMMSS-RANDOMTEXT-CLIP-N.mp4
-                now_ts = datetime.now().strftime("%d%m%Y%H%M%S")
-                rand_txt = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-                filename = f"{now_ts}-{rand_txt}-CLIP-{i+1}.mp4"
-
-                out_file = os.path.join(output_dir, filename)
-                
-                # Compatibility Fix: Force yuv420p and aac for Windows support
-                clip.write_videofile(
-                    out_file, 
-                    codec="libx264", 
-                    audio_codec="aac",
-                    bitrate=bitrate, 
-                    audio_bitrate="192k",
-                    preset="medium", 
-                    fps=out_fps, 
-                    threads=4,
-                    ffmpeg_params=[
-                        "-pix_fmt", "yuv420p",
-                        "-movflags", "+faststart"
-                    ],
-                    logger=None
-                )
-                
-                clip.close()
-                if final_audio: final_audio.close()
-            
-            video.close()
-            if bg_audio: bg_audio.close()
-            
-            if not self.stop_event.is_set():
-                self.status_msg.set("Done!")
-                if count_mode == "custom" and requested_count > max_clips:
-                     messagebox.showinfo("Completed", f"Video was too short for {requested_count} clips.\nGenerated {total} possible clips.")
-                else:
-                     messagebox.showinfo("Success", f"Generated {total} clips.")
+        estimate = result["estimate"]
+        if estimate is None:
+            self.status_msg.set(f"Estimate unavailable: {result['error']}")
+        else:
+            self.progress.apply("estimate", {"wall_s": estimate["wall_s"], "bytes": estimate["bytes"]})
+            message = describe_estimate(estimate)
+            warning = space_warning(estimate, job.output_dir)
+            if warning:
+                start = messagebox.askyesno("Render Estimate", f"{message}\n\n{warning}\n\nRender anyway?", icon="warning")
             else:
-                self.status_msg.set("Stopped.")
+                start = messagebox.askokcancel("Render Estimate", f"{message}\n\nStart rendering?")
+            if not start:
+                self.is_processing = False
+                self.toggle_inputs(True)
+                self.generate_btn.configure(text="START RENDER")
+                self.stop_btn.configure(state="disabled")
+                self.status_msg.set("Render cancelled.")
+                return
+            self.status_msg.set(message)
 
+        self.generate_btn.configure(text="RENDERING...")
+        self.stop_btn.configure(state="normal")
+        threading.Thread(target=self.generate_clips, args=(job, options, estimate, self.progress_channel),
+                         daemon=True).start()
+        self.after(PROGRESS_POLL_MS, self._poll_progress)
+
+    def build_job(self):
+        # 1. Calculate Crop Geometry (Relative to Original Image)
+        crop = None
+        if not self.aspect_ratio_mode.get().startswith("Original"):
+            iw, ih = self.frame_size
+            crop = crop_from_view(self.canvas.winfo_width(), self.canvas.winfo_height(), iw, ih,
+                                  self.scale, self.pan_x, self.pan_y, self.box_w, self.box_h)
+            print(f"Crop: x={crop[0]}, y={crop[1]}, w={crop[2]}, h={crop[3]}")
+
+        count = int(self.custom_clip_count.get()) if self.clip_count_mode.get() == "Custom" else None
+
+        return RenderJob(
+            video_path=self.video_path.get(),
+            output_dir=self.output_path.get(),
+            duration=float(self.clip_duration.get()),
+            crop=crop,
+            count=count,
+            audio_mode=self.audio_mode.get(),
+            audio_path=self.audio_path.get(),
+            resolution=self.quality_var.get(),
+            fps=self.fps_var.get(),
+            encoder=self.encoder_var.get().lower(),
+            boundaries="scenes" if self.boundaries_var.get() == "Scene Cuts" else "fixed",
+            reframe="auto" if crop is not None and self.framing_var.get() == "Auto Reframe" else "off",
+            selection="energy" if self.selection_var.get() == "Loudest Moments" else "sequential",
+            normalize_db=TARGET_DB if self.normalize_var.get() == "On" else None,
+        )
+
+    def render_options(self):
+        workers = self.workers_var.get()
+        workers = 1 if workers == "Off" else None if workers == "Auto" else int(workers)
+        render_mode = self.render_mode_var.get()
+        return {
+            "workers": workers,
+            "single_decode": render_mode == "Single Pass",
+            "backend": "ffmpeg" if render_mode.startswith("Native") else "pipelined" if render_mode == "Pipelined" else "moviepy",
+        }
+
+    def add_to_queue(self):
+        # Saves the current crop + settings for the headless runner (python jobqueue.py run)
+        if self.is_processing or self.queue_channel is not None: return
+        if not self.validate_inputs(): return
+        self.flush_redraw()
+        try:
+            job, options = self.build_job(), self.render_options()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Could not queue job: {e}")
+            return
+        # Planning can run the scene cut / loudness analyses: off the Tk thread, reporting through a channel
+        self.queue_channel = ProgressChannel()
+        self.status_msg.set("Planning clips for the queue...")
+        threading.Thread(target=self.queue_job, args=(job, options, self.queue_channel), daemon=True).start()
+        self.after(PROGRESS_POLL_MS, self._poll_queue)
+
+    def queue_job(self, job, options, channel):
+        # Planning thread: no Tk calls in here
+        try:
+            queue = JobQueue()
+            try:
+                source_id = queue.add(job, status=channel.status, stop_event=self.close_event, **options)
+            finally:
+                queue.close()
+            channel.post("queued", source_id=source_id)
+        except Exception as e:
+            channel.post("queued", error=str(e) or type(e).__name__)
+
+    def _poll_queue(self):
+        queued = None
+        for kind, data in self.queue_channel.drain():
+            if kind == "status" and not self.is_processing:
+                self.status_msg.set(data["text"])
+            elif kind == "queued":
+                queued = data
+        if queued is None:
+            self.after(PROGRESS_POLL_MS, self._poll_queue)
+            return
+        self.queue_channel = None
+        if "error" in queued:
+            messagebox.showerror("Error", f"Could not queue job: {queued['error']}")
+        elif not self.is_processing:
+            self.status_msg.set(f"Queued as job {queued['source_id']}.")
+
+    def generate_clips(self, job, options, estimate, channel):
+        # Render thread: no Tk calls in here
+        try:
+            written = render(job, status=channel.status, stop_event=self.stop_event, progress=channel,
+                             estimate=estimate, **options)
+            channel.post("finished", count=len(written))
         except Exception as e:
-            self.status_msg.set("Error")
-            messagebox.showerror("Error", str(e))
             import traceback
             traceback.print_exc()
-        finally:
-            self.is_processing = False
-            self.toggle_inputs(True)
-            self.generate_btn.configure(text="START RENDER")
-            self.stop_btn.configure(state="disabled")
+            channel.post("finished", error=str(e))
+
+    def _poll_progress(self):
+        finished = None
+        for kind, data in self.progress_channel.drain():
+            self.progress.apply(kind, data)
+            if kind == "finished":
+                finished = data
+        # Only the latest status line matters after a batch of events
+        if self.progress.status and not self.stop_event.is_set():
+            self.status_msg.set(self.progress.status)
+            self.progress.status = None
+        self.progress_bar.set(self.progress.fraction)
+        self.progress_lbl.configure(text=self.progress.describe() if self.progress.total else "")
+
+        if finished is None:
+            self.after(PROGRESS_POLL_MS, self._poll_progress)
+        else:
+            self.render_finished(finished)
+
+    def render_finished(self, result):
+        self.is_processing = False
+        self.toggle_inputs(True)
+        self.generate_btn.configure(text="START RENDER")
+        self.stop_btn.configure(state="disabled")
+
+        if "error" in result:
+            self.status_msg.set("Error")
+            messagebox.showerror("Error", result["error"])
+        elif not self.stop_event.is_set():
+            self.status_msg.set("Done!")
+            self.progress_bar.set(1)
+            message = f"Generated {result['count']} clips."
+            if self.progress.estimate and self.progress.summary:
+                message += "\n\n" + compare_estimate(self.progress.estimate, self.progress.summary)
+            messagebox.showinfo("Success", message)
+        else:
+            # Partial files are already cleaned up by the engine at this point
+            self.status_msg.set(f"Stopped ({time.perf_counter() - self.abort_time:.2f}s from Abort to idle).")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Parallel export workers in the frozen EXE
     app = VideoClipperApp()
     app.mainloop()
@@ -0,0 +1,142 @@
+import os
+import tempfile
+import subprocess
+
+import numpy as np
+
+from moviepy.audio.AudioClip import AudioArrayClip
+
+from ffmpeg_tools import FFMPEG_BINARY, run_ffmpeg, probe
+
+AUDIO_FPS = 44100
+CHANNELS = 2
+MMAP_BYTES = 256 * 1024 * 1024 # decoded tracks above this go to a memory-mapped temp file
+DUCK_WINDOW = 0.05 # seconds per loudness window when ducking
+
+
+def db_to_gain(db):
+    return 10.0 ** (db / 20.0)
+
+
+def scaled(clip, gain_db):
+    """`clip` (an AudioClip) with its level changed by `gain_db`."""
+    gain = db_to_gain(gain_db)
+    return clip.transform(lambda get_frame, t: get_frame(t) * gain, keep_duration=True)
+
+
+def decode_pcm(path, fps=AUDIO_FPS, channels=CHANNELS):
+    """Decode an audio file once to float32 PCM, shape (samples, channels).
+
+    Long tracks are written to a raw temp file and memory-mapped, so only the
+    parts actually used are paged in.
+    """
+    info = probe(path)
+    est_bytes = (info["duration"] or 0) * fps * channels * 4
+    fmt = ["-vn", "-ac", str(channels), "-ar", str(fps), "-f", "f32le"]
+
+    if est_bytes > MMAP_BYTES:
+        fd, raw = tempfile.mkstemp(prefix="proclip-pcm-", suffix=".f32")
+        os.close(fd)
+        run_ffmpeg(["-y", "-i", path] + fmt + [raw])
+        pcm = np.memmap(raw, dtype=np.float32, mode="r").reshape(-1, channels)
+        # The mapping keeps the data alive; the name can go now on POSIX
+        if os.name != "nt":
+            os.remove(raw)
+        return pcm
+
+    proc = subprocess.run([FFMPEG_BINARY, "-hide_banner", "-nostdin", "-i", path] + fmt + ["-"],
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if proc.returncode != 0 or not proc.stdout:
+        raise RuntimeError(f"Could not decode audio: {path}")
+    return np.frombuffer(proc.stdout, dtype=np.float32).reshape(-1, channels)
+
+
+def fit_channels(samples, channels=CHANNELS):
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    if samples.shape[1] == channels:
+        return samples
+    if samples.shape[1] == 1:
+        return np.repeat(samples, channels, axis=1)
+    return samples[:, :channels]
+
+
+def duck_envelope(original, fps, duck_db, threshold_db=-35.0, window=DUCK_WINDOW):
+    """Per-sample gain for the background: `duck_db` down wherever the original is active."""
+    n = len(original)
+    hop = max(1, int(window * fps))
+    frames = n // hop
+    if frames == 0:
+        return np.ones(n, dtype=np.float32)
+
+    # RMS per window, all channels together
+    blocks = original[:frames * hop].reshape(frames, hop, -1)
+    rms = np.sqrt(np.mean(np.square(blocks, dtype=np.float32), axis=(1, 2)))
+    active = rms > db_to_gain(threshold_db)
+    gain = np.where(active, db_to_gain(-abs(duck_db)), 1.0).astype(np.float32)
+
+    # Soften the steps (~4 windows) so ducking doesn't click. Edge padding keeps the ends at their
+    # own level; zero padding would fade the background in and out at every clip boundary.
+    k = 4
+    kernel = np.ones(k, dtype=np.float32) / k
+    gain = np.convolve(np.pad(gain, (k // 2, (k - 1) // 2), mode="edge"), kernel, mode="valid")
+
+    centers = (np.arange(frames) + 0.5) * hop
+    return np.interp(np.arange(n), centers, gain).astype(np.float32)
+
+
+class BackgroundTrack:
+    """Background music decoded once per batch; every clip's segment is an array slice."""
+    def __init__(self, path, fps=AUDIO_FPS, gain_db=0.0):
+        self.fps = fps
+        self.gain = db_to_gain(gain_db)
+        self.pcm = decode_pcm(path, fps)
+        self.looped = None # track from its start, looped and gain-applied, as long as the longest clip so far
+
+    def close(self):
+        """Release the decoded track now; on Windows this also deletes its memory-mapped temp file."""
+        path = getattr(self.pcm, "filename", None)
+        self.pcm = None
+        self.looped = None
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError: pass
+
+    def segment(self, duration):
+        """Track looped/trimmed to `duration` from its start.
+
+        Every clip's segment is a prefix of the same array, so clips of
+        varying length (scene snapped) share one buffer instead of one copy each.
+        """
+        n = int(round(duration * self.fps))
+        if self.looped is None or len(self.looped) < n:
+            if len(self.pcm) >= n:
+                seg = np.array(self.pcm[:n])
+            else:
+                # Loop: tile the whole track and trim
+                reps = -(-n // len(self.pcm))
+                seg = np.tile(self.pcm, (reps, 1))[:n]
+            self.looped = seg * self.gain if self.gain != 1.0 else seg
+        return self.looped[:n]
+
+    def mix(self, duration, original=None, original_gain_db=0.0, duck_db=0.0):
+        """Final audio clip: the background alone, or summed with `original` (an AudioClip)."""
+        bg = self.segment(duration)
+        if original is None:
+            return AudioArrayClip(bg, fps=self.fps)
+
+        orig = fit_channels(original.to_soundarray(fps=self.fps)).astype(np.float32)
+        n = len(bg)
+        if len(orig) < n:
+            orig = np.pad(orig, ((0, n - len(orig)), (0, 0)))
+        orig = orig[:n]
+        if original_gain_db:
+            orig = orig * db_to_gain(original_gain_db)
+
+        if duck_db:
+            out = orig + bg * duck_envelope(orig, self.fps, duck_db)[:, None]
+        else:
+            # Plain sum, like CompositeAudioClip
+            out = orig + bg
+        return AudioArrayClip(out, fps=self.fps)
@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+import ffmpeg_tools
+from media_cache import atomic_output, atomic_write_json, cache_dir
+
+CLIP_SECONDS = 10.0
+# name -> (width, height, fps, seconds). "loop" is shorter than a clip, so it exercises looping.
+SOURCES = {
+    "720p30-loop": (1280, 720, 30, 6.0),
+    "720p30": (1280, 720, 30, 30.0),
+    "1080p30": (1920, 1080, 30, 30.0),
+    "1080p60": (1920, 1080, 60, 20.0),
+    "1080p30-long": (1920, 1080, 30, 120.0),
+    "4k24": (3840, 2160, 24, 10.0),
+}
+QUICK_SOURCES = ["720p30-loop", "1080p30"]
+ASPECT_RATIOS = {"original": None, "9:16": 9 / 16, "1:1": 1.0}
+RESOLUTION_CHOICES = ["Original", "1080p", "720p"]
+QUICK_RESOLUTIONS = ["Original", "720p"]
+AUDIO_CHOICES = ["original", "mix", "background"]
+BG_SECONDS = 25.0 # shorter than the long sources, so the background loops too
+TOLERANCE = 0.10 # relative fps drop / memory growth that counts as a regression
+# --check: multi-clip renders that must keep working, on a source cut into exactly two clips.
+# Each keeps the source audio, so a clip closing the source's readers breaks clip 2.
+CHECK_SOURCE = "720p30-loop"
+CHECK_CLIP_SECONDS = 3.0
+CHECKS = {
+    "crop/mix-no-track": ["--crop", "400", "0", "480", "720"],
+    "crop/original": ["--crop", "400", "0", "480", "720", "--audio-mode", "original"],
+    "crop-letterbox/original": ["--crop", "-100", "0", "480", "720", "--audio-mode", "original"],
+    "crop/normalize": ["--crop", "400", "0", "480", "720", "--audio-mode", "original", "--normalize"],
+    "resize/original": ["--resolution", "360p", "--audio-mode", "original"],
+}
+
+
+def default_baseline_path():
+    return os.path.join(os.path.expanduser("~"), ".proclipstudio", "benchmark-baseline.json")
+
+
+def load_baselines(path):
+    """-> {engine args key: {"created", "engine_args", "cases"}}; numbers are only comparable
+    between runs with the same engine flags (backend, workers, ...)."""
+    if not os.path.exists(path): return {}
+    with open(path) as f:
+        data = json.load(f)
+    if "cases" in data:
+        # Single-baseline file from before baselines were kept per engine args
+        return {baseline_key(data.get("engine_args", [])): data}
+    return data.get("baselines", {})
+
+
+def baseline_key(engine_args):
+    return " ".join(engine_args)
+
+
+def synth_source(name):
+    """Test pattern + tone for SOURCES[name], generated once and cached."""
+    w, h, fps, seconds = SOURCES[name]
+    path = os.path.join(cache_dir("bench"), f"{name}.mp4")
+    if not os.path.exists(path):
+        atomic_output(path, lambda tmp: ffmpeg_tools.run_ffmpeg([
+            "-y", "-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate={fps}:duration={seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-crf", "23", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-b:a", "128k", "-shortest", tmp]))
+    return path
+
+
+def synth_background():
+    path = os.path.join(cache_dir("bench"), "background.m4a")
+    if not os.path.exists(path):
+        atomic_output(path, lambda tmp: ffmpeg_tools.run_ffmpeg([
+            "-y", "-f", "lavfi", "-i", f"sine=frequency=220:sample_rate=44100:duration={BG_SECONDS}",
+            "-ac", "2", "-c:a", "aac", "-b:a", "128k", tmp]))
+    return path
+
+
+def centre_crop(size, ratio):
+    """(x, y, w, h) of the largest `ratio` (w/h) box centred in the frame, None for the original frame."""
+    if ratio is None: return None
+    w, h = size
+    if w / h > ratio:
+        box_w, box_h = h * ratio, h
+    else:
+        box_w, box_h = w, w / ratio
+    return (w - box_w) / 2, (h - box_h) / 2, box_w, box_h
+
+
+def cases(quick=False):
+    """-> [(key, source name, aspect ratio, resolution, audio mode)]"""
+    sources = QUICK_SOURCES if quick else list(SOURCES)
+    resolutions = QUICK_RESOLUTIONS if quick else RESOLUTION_CHOICES
+    out = []
+    for source in sources:
+        for ar in ASPECT_RATIOS:
+            for res in resolutions:
+                for audio in AUDIO_CHOICES:
+                    out.append((f"{source}/{ar}/{res}/{audio}", source, ar, res, audio))
+    return out
+
+
+def run_case(source, ar, res, audio, bg_path, extra_args, work_dir):
+    """Render one case through the engine CLI in its own process (clean peak RSS) -> measurements."""
+    w, h = SOURCES[source][:2]
+    out_dir = os.path.join(work_dir, "out")
+    tele_dir = os.path.join(work_dir, "telemetry")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    shutil.rmtree(tele_dir, ignore_errors=True)
+    os.makedirs(tele_dir)
+
+    args = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "engine.py"),
+            synth_source(source), "-o", out_dir, "-d", str(CLIP_SECONDS), "--resolution", res,
+            "--audio-mode", audio, "--force", "--telemetry", tele_dir] + extra_args
+    crop = centre_crop((w, h), ASPECT_RATIOS[ar])
+    if crop:
+        args += ["--crop"] + [f"{v:.2f}" for v in crop]
+    if audio != "original":
+        args += ["--audio", bg_path]
+
+    proc = subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode("utf-8", "replace").strip()[-500:])
+    with open(os.path.join(tele_dir, "summary.json")) as f:
+        summary = json.load(f)
+    return {
+        "fps": summary["fps"],
+        "wall_s": summary["wall_s"],
+        "frames": summary["frames"],
+        "peak_rss_bytes": summary["peak_rss_bytes"],
+        "peak_child_rss_bytes": summary["peak_child_rss_bytes"],
+        "pipeline": summary["pipeline"],
+    }
+
+
+def run_check(check_args, extra_args, work_dir):
+    """Render CHECK_SOURCE with `check_args` -> problems (empty when both clips came out whole)."""
+    out_dir = os.path.join(work_dir, "check")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    args = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "engine.py"),
+            synth_source(CHECK_SOURCE), "-o", out_dir, "-d", str(CHECK_CLIP_SECONDS), "--force",
+            "--no-telemetry"] + check_args + extra_args
+    proc = subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        return [proc.stderr.decode("utf-8", "replace").strip().splitlines()[-1]]
+
+    expected = int(SOURCES[CHECK_SOURCE][3] // CHECK_CLIP_SECONDS)
+    outputs = sorted(name for name in os.listdir(out_dir) if name.endswith(".mp4"))
+    problems = [] if len(outputs) == expected else [f"{len(outputs)} clips written, expected {expected}"]
+    for name in outputs:
+        info = ffmpeg_tools.probe(os.path.join(out_dir, name))
+        if info["audio_codec"] is None:
+            problems.append(f"{name}: no audio")
+        if not info["duration"] or abs(info["duration"] - CHECK_CLIP_SECONDS) > 0.25:
+            problems.append(f"{name}: {info['duration']}s, expected {CHECK_CLIP_SECONDS}s")
+    return problems
+
+
+def compare(result, base, tolerance=TOLERANCE):
+    """Regression messages for one case (empty when within tolerance or no baseline)."""
+    problems = []
+    if not base: return problems
+    if base.get("fps") and result.get("fps") and result["fps"] < base["fps"] * (1 - tolerance):
+        problems.append(f"fps {result['fps']:.1f} < {base['fps']:.1f}")
+    for key, label in (("peak_rss_bytes", "rss"), ("peak_child_rss_bytes", "ffmpeg rss")):
+        if base.get(key) and result.get(key) and result[key] > base[key] * (1 + tolerance):
+            problems.append(f"{label} {result[key] / 2**20:.0f} MiB > {base[key] / 2**20:.0f} MiB")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ProClip Studio render benchmark (synthetic media)")
+    parser.add_argument("--quick", action="store_true", help="Two sources, two resolutions")
+    parser.add_argument("--filter", default="", help="Only cases whose key contains this (e.g. 4k24/9:16)")
+    parser.add_argument("--baseline", default=None, help="Baseline file (default: ~/.proclipstudio/benchmark-baseline.json)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help=f"Allowed relative change (default: {TOLERANCE})")
+    parser.add_argument("--output", default=None, help="Also write the results as JSON here")
+    parser.add_argument("--check", action="store_true",
+                        help="Instead of timing, check that multi-clip crop/resize renders keep the source audio")
+    parser.add_argument("engine_args", nargs=argparse.REMAINDER,
+                        help="Extra engine.py flags after --, e.g. -- --backend ffmpeg -j 0")
+    args = parser.parse_args(argv)
+    extra = [a for a in args.engine_args if a != "--"]
+
+    if args.check:
+        failed = 0
+        work_dir = tempfile.mkdtemp(prefix="proclip-check-")
+        try:
+            for name, check_args in CHECKS.items():
+                problems = run_check(check_args, extra, work_dir)
+                failed += bool(problems)
+                print(f"{name}: {'FAILED ' + '; '.join(problems) if problems else 'ok'}")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        print(f"{len(CHECKS)} checks, {failed} failure(s).")
+        return 1 if failed else 0
+
+    baseline_path = args.baseline or default_baseline_path()
+    baselines = load_baselines(baseline_path)
+    args_key = baseline_key(extra)
+    baseline = baselines.get(args_key, {}).get("cases", {})
+    if not baseline and baselines:
+        print(f"No baseline for engine args '{args_key}' yet (have: {', '.join(repr(k) for k in baselines)}).")
+
+    selected = [c for c in cases(args.quick) if args.filter in c[0]]
+    print(f"Generating sources ({len({c[1] for c in selected})})...")
+    bg_path = synth_background()
+
+    results, regressions, failures = {}, {}, {}
+    work_dir = tempfile.mkdtemp(prefix="proclip-bench-")
+    try:
+        for n, (key, source, ar, res, audio) in enumerate(selected):
+            try:
+                result = run_case(source, ar, res, audio, bg_path, extra, work_dir)
+            except Exception as e:
+                failures[key] = str(e)
+                print(f"[{n+1}/{len(selected)}] {key}: FAILED {e}")
+                continue
+            results[key] = result
+            problems = compare(result, baseline.get(key), args.tolerance)
+            if problems:
+                regressions[key] = problems
+            base = baseline.get(key, {}).get("fps")
+            delta = f" ({(result['fps'] / base - 1) * 100:+.1f}%)" if base and result["fps"] else ""
+            rss = (result["peak_rss_bytes"] or 0) / 2**20
+            flag = "  REGRESSION: " + "; ".join(problems) if problems else ""
+            print(f"[{n+1}/{len(selected)}] {key}: {result['fps']} fps{delta}, {rss:.0f} MiB [{result['pipeline']}]{flag}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {"created": datetime.now().isoformat(timespec="seconds"), "engine_args": extra, "cases": results,
+              "regressions": regressions, "failures": failures}
+    if args.output:
+        atomic_write_json(os.path.abspath(args.output), report, indent=2)
+    if args.update_baseline:
+        # Only merged with earlier results for the same engine args; other flag sets keep their own
+        baselines[args_key] = {"created": report["created"], "engine_args": extra, "cases": {**baseline, **results}}
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        atomic_write_json(os.path.abspath(baseline_path), {"baselines": baselines}, indent=2)
+        print(f"Baseline written to {baseline_path}")
+
+    print(f"{len(results)} cases, {len(regressions)} regression(s), {len(failures)} failure(s).")
+    return 1 if regressions or failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
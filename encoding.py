@@ -0,0 +1,103 @@
+import os
+import re
+import time
+import shutil
+import tempfile
+from dataclasses import dataclass, asdict
+
+import ffmpeg_tools
+
+AUTOTUNE_SECONDS = 4.0 # length of the source sample the auto-tuner encodes
+MIN_SSIM = 0.97 # default quality floor for "auto"
+# Fastest first; the tuner measures each one anyway, since the ranking shifts with content and CPU
+AUTOTUNE_PRESETS = ["veryfast", "faster", "fast", "medium"]
+AUTOTUNE_CRFS = [24, 21, 18]
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """x264 settings for one render. `crf` None means the resolution's target bitrate (RESOLUTIONS)."""
+    preset: str = "medium"
+    crf: int = None
+    tune: str = None
+    threads: int = None # None = decided by the CPU budget
+
+    def video_args(self, bitrate, threads):
+        """ffmpeg encoder options for the native backend."""
+        args = ["-c:v", "libx264", "-preset", self.preset]
+        args += ["-crf", str(self.crf)] if self.crf is not None else ["-b:v", bitrate]
+        if self.tune:
+            args += ["-tune", self.tune]
+        return args + ["-threads", str(self.threads or threads)]
+
+    def moviepy_args(self, bitrate):
+        """-> (bitrate, extra ffmpeg_params) for write_videofile / FFMPEG_VideoWriter."""
+        extra = []
+        if self.crf is not None:
+            extra += ["-crf", str(self.crf)]
+        if self.tune:
+            extra += ["-tune", self.tune]
+        return (None if self.crf is not None else bitrate), extra
+
+    def settings(self):
+        return asdict(self)
+
+
+PROFILES = {
+    # Quick turnaround for drafts and social uploads that get re-encoded anyway
+    "fast": EncoderProfile(preset="veryfast", crf=23),
+    # The bitrate table per resolution (what every render used before profiles existed)
+    "balanced": EncoderProfile(preset="medium"),
+    # Masters: near transparent quality, file size second
+    "archival": EncoderProfile(preset="slow", crf=16),
+}
+ENCODER_CHOICES = list(PROFILES) + ["auto"]
+
+
+def _count_frames(path, stop_event=None):
+    log = ffmpeg_tools._ffmpeg_log(["-i", path, "-map", "0:v:0", "-c", "copy", "-f", "null", "-"], stop_event)
+    found = re.findall(r"frame=\s*(\d+)", log)
+    return int(found[-1]) if found else 0
+
+
+def auto_tune(src, start, duration, video_filter, threads, min_ssim=MIN_SSIM, status=None, stop_event=None):
+    """Encode a sample of `src` with each candidate and pick the fastest one above `min_ssim`.
+
+    The sample is filtered once into a lossless reference, so every
+    candidate is timed on encoding alone. Returns (profile, measurements)
+    where measurements is [{preset, crf, fps, ssim, psnr}]; falls back to
+    the archival profile when nothing meets the floor. Setting `stop_event`
+    kills the running encode or comparison and raises ffmpeg_tools.Cancelled.
+    """
+    status = status or (lambda msg: None)
+    tmp_dir = tempfile.mkdtemp(prefix="proclip-tune-")
+    try:
+        reference = os.path.join(tmp_dir, "reference.mkv")
+        ffmpeg_tools.run_ffmpeg(["-y", "-ss", f"{start:.6f}", "-i", src, "-t", f"{duration:.6f}",
+                                 "-map", "0:v:0", "-an", "-vf", video_filter,
+                                 "-c:v", "libx264", "-qp", "0", "-preset", "ultrafast", "-pix_fmt", "yuv420p", reference],
+                                stop_event)
+        frames = _count_frames(reference, stop_event)
+
+        measurements = []
+        candidates = [EncoderProfile(preset=preset, crf=crf) for preset in AUTOTUNE_PRESETS for crf in AUTOTUNE_CRFS]
+        for n, profile in enumerate(candidates):
+            status(f"Auto-tune: testing {profile.preset} / CRF {profile.crf} ({n+1}/{len(candidates)})...")
+            out = os.path.join(tmp_dir, f"candidate-{n}.mp4")
+            started = time.perf_counter()
+            ffmpeg_tools.run_ffmpeg(["-y", "-i", reference, "-an"] + profile.video_args(None, threads)
+                                    + ["-pix_fmt", "yuv420p", out], stop_event)
+            elapsed = time.perf_counter() - started
+            ssim, psnr = ffmpeg_tools.compare_quality(out, reference, stop_event)
+            measurements.append({"preset": profile.preset, "crf": profile.crf, "fps": round(frames / max(elapsed, 1e-6), 2),
+                                 "ssim": ssim, "psnr": psnr, "bytes": os.path.getsize(out)})
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    passing = [m for m in measurements if m["ssim"] >= min_ssim]
+    if not passing:
+        return PROFILES["archival"], measurements
+    # Fastest wins; near ties (within 5%) go to the smaller file
+    top = max(m["fps"] for m in passing)
+    best = min((m for m in passing if m["fps"] >= top * 0.95), key=lambda m: m["bytes"])
+    return EncoderProfile(preset=best["preset"], crf=best["crf"]), measurements
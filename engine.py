@@ -0,0 +1,1321 @@
+import os
+import json
+import math
+import time
+import atexit
+import hashlib
+import argparse
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+# MoviePy 2.x imports
+from moviepy import VideoClip, VideoFileClip, AudioClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+import ffmpeg_tools
+from audio_tools import BackgroundTrack, scaled
+from encoding import ENCODER_CHOICES, MIN_SSIM, PROFILES, AUTOTUNE_SECONDS, EncoderProfile, auto_tune
+from loudness import LOUDNESS_VERSION, TARGET_DB, audio_envelope, loudest_windows, output_gain_db
+from manifest import RenderManifest
+from pipeline import PIPELINE_WORKERS, run_pipeline
+from reframe import REFRAME_VERSION, CropPath, subject_path
+from scenes import SNAP_TOLERANCE, scene_cuts, snap_to_cuts
+from media_cache import atomic_write_json, cache_dir, cached_probe, content_fingerprint, keyframe_index, source_key
+from telemetry import RenderTelemetry, StageTimer, clip_record, telemetry_dir
+
+# Resolution label -> (target short side in px, video bitrate)
+RESOLUTIONS = {
+    "Original": (None, "8000k"),
+    "4k": (2160, "20000k"),
+    "1080p": (1080, "8000k"),
+    "720p": (720, "4000k"),
+    "480p": (480, "2500k"),
+    "360p": (360, "1000k"),
+    "240p": (240, "500k"),
+    "144p": (144, "300k"),
+}
+AUDIO_MODES = ["mix", "background", "original"]
+BOUNDARY_MODES = ["fixed", "scenes"]
+SELECTION_MODES = ["sequential", "energy"]
+REFRAME_MODES = ["off", "auto"]
+FPS_CHOICES = ["Source", "60", "30", "24"]
+ENCODER_THREADS = 4 # x264 threads per clip when no CPU budget is given
+AUDIO_BITRATE = "192k"
+PARTIAL_DIR = ".partial" # where aborted outputs go with partial="quarantine"
+IDENTITY_VERSION = 1 # bump when a change to the pipeline alters output bytes for the same inputs
+LOOP_CACHE_BYTES = 1024 * 1024 * 1024 # decoded frames kept in RAM when looping short sources
+# Compatibility Fix: Force yuv420p for Windows support
+FFMPEG_PARAMS = [
+    "-pix_fmt", "yuv420p",
+    "-movflags", "+faststart"
+]
+
+
+@dataclass
+class RenderJob:
+    """One source cut into clips. Crop is (x, y, w, h) in source pixels, None keeps the original frame."""
+    video_path: str
+    output_dir: str
+    duration: float = 60.0
+    crop: tuple = None
+    count: int = None # None = Automatic (as many full clips as fit)
+    audio_mode: str = "mix"
+    audio_path: str = ""
+    resolution: str = "Original"
+    fps: str = "Source"
+    stream_copy: str = "smart" # "off", "keyframe" (cuts snap to keyframes) or "smart" (exact cuts)
+    bg_gain_db: float = 0.0 # background track level
+    original_gain_db: float = 0.0 # source audio level in "mix"
+    duck_db: float = 0.0 # "mix": lower the background by this much while the source is audible (0 = off)
+    encoder: str = "balanced" # encoding.PROFILES name, or "auto" (tuned on a sample of the source)
+    min_ssim: float = MIN_SSIM # quality floor for "auto"
+    boundaries: str = "fixed" # "fixed" (every `duration` seconds) or "scenes" (snapped to shot cuts)
+    snap_tolerance: float = SNAP_TOLERANCE # seconds a boundary may move to reach a cut
+    reframe: str = "off" # "auto": the crop box (its size from `crop`) follows the subject over time
+    selection: str = "sequential" # "energy": the `count` loudest, most active stretches instead of the first ones
+    normalize_db: float = None # output loudness in dB (gated RMS, ~LUFS); None leaves levels as mixed
+
+
+def crop_from_view(canvas_w, canvas_h, image_w, image_h, scale, pan_x, pan_y, box_w, box_h):
+    """Map the editor's on-screen crop box back to source pixels -> (real_x, real_y, real_w, real_h)."""
+    # Image is drawn centred on the canvas (shifted by pan) at `scale`,
+    # the crop box is fixed at the canvas centre.
+    cx = canvas_w / 2
+    cy = canvas_h / 2
+
+    img_tl_x = cx + pan_x - image_w * scale / 2
+    img_tl_y = cy + pan_y - image_h * scale / 2
+
+    box_tl_x = cx - box_w / 2
+    box_tl_y = cy - box_h / 2
+
+    # Intersection relative to image TL, converted to original scale
+    real_x = (box_tl_x - img_tl_x) / scale
+    real_y = (box_tl_y - img_tl_y) / scale
+    real_w = box_w / scale
+    real_h = box_h / scale
+    return real_x, real_y, real_w, real_h
+
+
+def plan_clips(source_duration, dur, count=None):
+    """Time ranges for every clip -> (ranges, loops, max_clips_possible).
+
+    Sources shorter than `dur` are looped `loops` times first; ranges refer to
+    that looped timeline. Ranges running past the end backtrack so they end
+    exactly at the end of the source.
+    """
+    loops = 1
+    if source_duration < dur:
+        # Example: Vid=10s, Dur=60s. Need 6 loops.
+        loops = math.ceil(dur / source_duration)
+    timeline = source_duration * loops
+
+    max_clips_possible = math.floor(timeline / dur)
+    total = max_clips_possible if count is None else count
+    if total < 1: total = 1 # At least one
+
+    ranges = []
+    for i in range(total):
+        start = i * dur
+        end = start + dur
+        if end > timeline:
+            # Backtrack: grab the last `dur` seconds
+            start = max(0, timeline - dur)
+            end = timeline
+        ranges.append((start, end))
+    return ranges, loops, max_clips_possible
+
+
+def job_ranges(job, source_duration, status=None, stop_event=None):
+    """plan_clips() for `job`, with boundaries moved onto shot cuts for `boundaries="scenes"`.
+
+    With `selection="energy"` the same number of clips is taken from the
+    loudest, most active stretches of the source audio (loudness.py) and
+    put in time order; sources without audio keep the plan. Looped sources
+    keep the fixed plan (each clip is the whole source repeated anyway).
+    The tolerance is capped at a quarter clip so a clip never loses more
+    than half its length.
+    """
+    ranges, loops, max_clips_possible = plan_clips(source_duration, job.duration, job.count)
+    if job.selection == "energy" and loops == 1:
+        env = audio_envelope(job.video_path, status, stop_event)
+        if env is not None:
+            # Non-overlapping picks, so asking for more than fit yields only as many as fit
+            last = source_duration - job.duration
+            ranges = [(min(s, last), min(s, last) + job.duration) for s in loudest_windows(env, job.duration, len(ranges))]
+    if job.boundaries == "scenes" and loops == 1:
+        ranges = snap_to_cuts(job.video_path, ranges, min(job.snap_tolerance, job.duration / 4), status, stop_event)
+    return ranges, loops, max_clips_possible
+
+
+def export_settings(resolution, fps, source_fps):
+    """-> (target_res_val, bitrate, out_fps) for the given UI choices."""
+    target_res_val, bitrate = RESOLUTIONS.get(resolution, RESOLUTIONS["Original"])
+    out_fps = source_fps if fps == "Source" else float(fps)
+    return target_res_val, bitrate, out_fps
+
+
+def even_size(w, h):
+    """Round dimensions down to even numbers (required by libx264)."""
+    w, h = int(w), int(h)
+    return w - (w % 2), h - (h % 2)
+
+
+def render_geometry(src_size, crop, target_res_val):
+    """Pixel geometry of the crop/letterbox and resolution steps, shared by every backend.
+
+    canvas: even crop box size (None = no crop), offset: video top-left on
+    that canvas, window: visible source rect (x0, y0, x1, y1), scaled: size
+    after resizing (None = no resize), size: final even output size.
+    """
+    w, h = src_size
+    geo = {"canvas": None, "offset": (0, 0), "window": (0, 0, w, h), "scaled": None, "size": (w, h)}
+
+    if crop is not None:
+        bg_w, bg_h = even_size(crop[2], crop[3])
+        if bg_w > 0 and bg_h > 0:
+            off_x, off_y = -int(crop[0]), -int(crop[1])
+            window = (max(0, -off_x), max(0, -off_y), min(w, bg_w - off_x), min(h, bg_h - off_y))
+            geo.update(canvas=(bg_w, bg_h), offset=(off_x, off_y), window=window, size=(bg_w, bg_h))
+
+    if target_res_val is not None:
+        cw, ch = geo["size"]
+        if cw >= ch:
+            scaled = (int(cw * target_res_val / ch), target_res_val)
+        else:
+            scaled = (target_res_val, int(ch * target_res_val / cw))
+        geo.update(scaled=scaled, size=even_size(*scaled))
+    return geo
+
+
+class Letterbox:
+    """Per-frame crop/letterbox with the slice windows worked out once per render.
+
+    Equivalent to compositing the video at (-real_x, -real_y) over a black
+    ColorClip, but without allocating a background or blitting the full
+    frame: when the box lies inside the video the result is a plain view of
+    the source frame, otherwise the visible part is copied into one
+    preallocated buffer whose padding stays black.
+    """
+    def __init__(self, src_size, crop):
+        geo = render_geometry(src_size, crop, None)
+        self.size = geo["canvas"]
+        off_x, off_y = geo["offset"]
+        x0, y0, x1, y1 = geo["window"]
+        x1, y1 = max(x0, x1), max(y0, y1)
+
+        self.src = (slice(y0, y1), slice(x0, x1))
+        self.dst = (slice(y0 + off_y, y1 + off_y), slice(x0 + off_x, x1 + off_x))
+        # No padding visible -> the crop box is just a window into the frame
+        self.view_only = (x1 - x0, y1 - y0) == self.size
+        self.buffer = None
+
+    def __call__(self, frame):
+        if self.view_only:
+            return frame[self.src]
+        if self.buffer is None or self.buffer.shape[2:] != frame.shape[2:] or self.buffer.dtype != frame.dtype:
+            bg_w, bg_h = self.size
+            self.buffer = np.zeros((bg_h, bg_w) + frame.shape[2:], dtype=frame.dtype)
+        self.buffer[self.dst] = frame[self.src]
+        return self.buffer
+
+
+class FrameTransform:
+    """Crop/letterbox + resize of one frame into a caller-supplied buffer (the pipelined path).
+
+    Safe to call from several threads at once: the letterbox canvas is per
+    thread, and PIL releases the GIL while resampling.
+    """
+    def __init__(self, src_size, crop, target_res_val):
+        geo = render_geometry(src_size, crop, target_res_val)
+        self.letterbox = Letterbox(src_size, crop) if geo["canvas"] else None
+        self.scaled = geo["scaled"]
+        self.size = geo["size"]
+        self.local = threading.local()
+
+    def __call__(self, frame, out):
+        lb = self.letterbox
+        if lb is not None:
+            if lb.view_only:
+                frame = frame[lb.src]
+            else:
+                canvas = getattr(self.local, "canvas", None)
+                if canvas is None:
+                    bg_w, bg_h = lb.size
+                    canvas = self.local.canvas = np.zeros((bg_h, bg_w) + frame.shape[2:], dtype=frame.dtype)
+                canvas[lb.dst] = frame[lb.src]
+                frame = canvas
+        if self.scaled is not None:
+            frame = np.asarray(Image.fromarray(frame).resize(self.scaled, Image.Resampling.LANCZOS))
+        w, h = self.size
+        out[...] = frame[:h, :w]
+
+
+def reframes(job):
+    """True when `job` renders with a subject-following crop path instead of its static crop box."""
+    return job.reframe == "auto" and job.crop is not None
+
+
+def apply_crop(clip, crop):
+    """Place the video on a black box of the crop size (letterboxing where the box leaves the frame)."""
+    bg_w, bg_h = even_size(crop[2], crop[3])
+    if bg_w <= 0 or bg_h <= 0:
+        return clip
+    # Box is (0, 0) to (w, h) in output coords; video top-left sits at (-real_x, -real_y).
+    return clip.image_transform(Letterbox(clip.size, crop))
+
+
+class LoopedFrames:
+    """Frame function for a source repeated end to end: output time maps to t % duration.
+
+    When the whole decoded loop fits in `cache_bytes` each source frame is kept
+    after its first decode, so later repeats never seek or decode again;
+    otherwise frames are streamed and the reader rewinds once per repeat.
+    """
+    def __init__(self, video, cache_bytes=LOOP_CACHE_BYTES):
+        self.video = video
+        self.fps = video.fps
+        self.period = video.duration
+        self.n_frames = max(1, int(round(video.duration * video.fps)))
+        w, h = video.size
+        self.cache = [None] * self.n_frames if self.n_frames * w * h * 3 <= cache_bytes else None
+
+    def __call__(self, t):
+        # Same frame index rule as FFMPEG_VideoReader
+        i = min(int(self.fps * (t % self.period) + 0.00001), self.n_frames - 1)
+        if self.cache is None:
+            return self.video.get_frame(i / self.fps)
+        frame = self.cache[i]
+        if frame is None:
+            frame = self.cache[i] = self.video.get_frame(i / self.fps)
+        return frame
+
+
+def loop_audio(audio, period, duration):
+    """Audio repeated with period `period`, decoded once into memory (looped sources are short)."""
+    fps = audio.fps or 44100
+    samples = audio.to_soundarray(fps=fps)
+    n = len(samples)
+
+    def frame_function(t):
+        idx = np.minimum((np.mod(t, period) * fps).astype(int), n - 1)
+        return samples[idx]
+
+    return AudioClip(frame_function=frame_function, duration=duration, fps=fps)
+
+
+def loop_clip(video, loops, cache_bytes=LOOP_CACHE_BYTES):
+    """`video` repeated `loops` times without concatenating copies of it."""
+    duration = video.duration * loops
+    looped = VideoClip(frame_function=LoopedFrames(video, cache_bytes), duration=duration).with_fps(video.fps)
+    if video.audio is not None:
+        looped = looped.with_audio(loop_audio(video.audio, video.duration, duration))
+    return looped
+
+
+def apply_resolution(clip, target_res_val):
+    """Scale so the short side matches `target_res_val`, keeping even dimensions."""
+    if target_res_val is None:
+        return clip
+
+    curr_w, curr_h = clip.size
+    if curr_w >= curr_h:
+        # Landscape: Set Height
+        clip = clip.resized(height=target_res_val)
+    else:
+        # Portrait: Set Width
+        clip = clip.resized(width=target_res_val)
+
+    rw, rh = clip.size
+    new_rw, new_rh = even_size(rw, rh)
+    if new_rw != int(rw) or new_rh != int(rh):
+        clip = clip.cropped(width=new_rw, height=new_rh, x_center=rw/2, y_center=rh/2)
+    return clip
+
+
+def encoder_settings(job, pipeline, profile):
+    """Encoder side of a clip's identity for the given render path (see render_pipeline())."""
+    if pipeline in ("keyframe", "smart"):
+        return {"pipeline": pipeline}
+    return {
+        "pipeline": pipeline,
+        "codec": "libx264",
+        **profile.settings(),
+        "bitrate": RESOLUTIONS.get(job.resolution, RESOLUTIONS["Original"])[1] if profile.crf is None else None,
+        "audio_codec": "aac",
+        "audio_bitrate": AUDIO_BITRATE,
+        "params": FFMPEG_PARAMS,
+    }
+
+
+def clip_identity(job, start, end, pipeline, fingerprint=content_fingerprint, profile=PROFILES["balanced"]):
+    """Content address of one output clip: a hash of every input that decides its bytes."""
+    uses_track = job.audio_mode in ("mix", "background") and bool(job.audio_path)
+    spec = {
+        "version": IDENTITY_VERSION,
+        "source": fingerprint(job.video_path),
+        "range": [round(start, 6), round(end, 6)],
+        "crop": [round(v, 3) for v in job.crop] if job.crop is not None else None,
+        "resolution": job.resolution,
+        "fps": job.fps,
+        "audio": {
+            "mode": job.audio_mode,
+            "track": fingerprint(job.audio_path) if uses_track else None,
+            "bg_gain_db": job.bg_gain_db,
+            "original_gain_db": job.original_gain_db,
+            "duck_db": job.duck_db,
+        },
+        "encoder": encoder_settings(job, pipeline, profile),
+    }
+    if reframes(job):
+        # Only present when used, so identities of static-crop clips stay as they were. The analysis
+        # versions are included so a changed tracker or loudness measurement re-renders.
+        spec["reframe"] = {"mode": job.reframe, "version": REFRAME_VERSION}
+    if job.normalize_db is not None:
+        spec["audio"]["normalize"] = {"db": job.normalize_db, "version": LOUDNESS_VERSION}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def temp_audio_file(out_file):
+    """Side file a clip's audio is encoded to before muxing."""
+    return os.path.splitext(out_file)[0] + "TEMP_MPY_wvf_snd.m4a"
+
+
+def clip_filename(video_path, i, clip_id):
+    # Filename format: SOURCENAME-IDENTITY-CLIP-N.mp4 (same inputs, same name)
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    return f"{stem}-{clip_id[:12]}-CLIP-{i+1}.mp4"
+
+
+class ClipRenderer:
+    """Opened source/background handles plus export settings for one job.
+
+    Created once per process (the GUI thread or a pool worker) and reused for
+    every clip that process renders. Once `stop_event` is set the next frame
+    pulled raises ffmpeg_tools.Cancelled, so an abort lands within a few frames.
+    `on_frame()` is called for every frame written, up to the clip's planned frame count.
+    """
+    def __init__(self, job, threads=ENCODER_THREADS, profile=PROFILES["balanced"], stop_event=None, on_frame=None):
+        self.job = job
+        self.stop_event = stop_event
+        self.on_frame = on_frame
+        self.profile = profile
+        self.threads = profile.threads or threads
+        self.video = VideoFileClip(job.video_path)
+
+        # Audio Prep
+        self.bg_audio = None
+        if job.audio_mode in ["mix", "background"] and job.audio_path:
+            try:
+                # Decoded once for the whole batch; each clip just slices it
+                self.bg_audio = BackgroundTrack(job.audio_path, gain_db=job.bg_gain_db)
+            except: pass
+
+        self.ranges, self.loops, self.max_clips_possible = job_ranges(job, self.video.duration)
+        self.target_res_val, self.bitrate, self.out_fps = export_settings(job.resolution, job.fps, self.video.fps)
+        # CRF profiles drop the bitrate and pass -crf through ffmpeg_params instead
+        self.encode_bitrate, extra = profile.moviepy_args(self.bitrate)
+        self.ffmpeg_params = FFMPEG_PARAMS + extra
+
+        self.source = self.video
+        if self.loops > 1:
+            self.source = loop_clip(self.video, self.loops)
+        # Crop window per source time; the path itself was analysed once per source (reframe.py)
+        self.reframe = None
+        if reframes(job):
+            self.reframe = CropPath(subject_path(job.video_path), self.video.size, even_size(job.crop[2], job.crop[3]),
+                                    period=self.video.duration)
+
+        self.timer = StageTimer()
+        self.stats = None # telemetry of the last render_clip()
+        self.stop_seen = None # perf_counter() when a frame pull first saw the stop event
+
+    def saw_stop(self):
+        """Stamp the first time this renderer noticed the abort (the start of the drain)."""
+        if self.stop_seen is None:
+            self.stop_seen = time.perf_counter()
+
+    def _timed(self, stage, clip):
+        return clip.transform(lambda get_frame, t: self.timer.call(stage, get_frame, t))
+
+    def _check_stop(self, get_frame, t):
+        if self.stop_event is not None and self.stop_event.is_set():
+            self.saw_stop()
+            raise ffmpeg_tools.Cancelled()
+        return get_frame(t)
+
+    def transform_video(self, clip, start=0.0):
+        """Crop/letterbox and resolution steps of the job applied to `clip`, which starts at
+        `start` on the source timeline (each step timed)."""
+        clip = self._timed("decode", clip.transform(self._check_stop))
+        if self.reframe is not None:
+            clip = self._timed("crop", clip.transform(lambda get_frame, t: self.reframe(get_frame(t), start + t)))
+        elif self.job.crop is not None:
+            clip = self._timed("crop", apply_crop(clip, self.job.crop))
+        if self.target_res_val is not None:
+            clip = self._timed("resize", apply_resolution(clip, self.target_res_val))
+        return clip
+
+    def build_audio(self, original_audio, start, end):
+        """Final audio for the clip [start, end) given the source audio of that range (None = keep the original)."""
+        job = self.job
+        audio = None
+        # Scene snapped clips vary in length, so the track is cut to the clip's own range
+        if self.bg_audio and job.audio_mode == "background":
+            audio = self.bg_audio.mix(end - start)
+        elif self.bg_audio and job.audio_mode == "mix":
+            audio = self.bg_audio.mix(end - start, original_audio, job.original_gain_db, job.duck_db)
+        if job.normalize_db is None:
+            return audio
+        # Gain from the cached loudness envelopes: no second pass over the mixed audio
+        audio = audio or original_audio
+        gain_db = output_gain_db(job, start, end)
+        return scaled(audio, gain_db) if audio is not None and gain_db else audio
+
+    def render_clip(self, start, end, out_file):
+        started = time.perf_counter()
+        before = self.timer.snapshot()
+        clip = self.transform_video(self.source.subclipped(start, end), start)
+
+        # The clip's audio goes to a side file first; the video writer is ours, so an abort can kill it
+        entry = self.timer.call("audio", self._open_writer, start, end, out_file, clip.size)
+        planned = int((end - start) * self.out_fps)
+        try:
+            for n, frame in enumerate(clip.iter_frames(fps=self.out_fps, dtype="uint8", logger=None)):
+                entry[0].write_frame(frame)
+                # Counted per frame written, not pulled: MoviePy also pulls frames to size the
+                # transformed clip. Capped so progress never passes the plan.
+                if self.on_frame is not None and n < planned:
+                    self.on_frame()
+        except BaseException:
+            # Killed rather than flushed: RenderContext removes the partial file anyway
+            self._abort_segment_writer(entry)
+            raise
+        # `clip` is a view sharing self.video's readers, which stay open for the next clip
+        # (ClipRenderer.close() releases them)
+        self._close_segment_writer(entry)
+        self.stats = clip_record(time.perf_counter() - started, planned, self.timer.since(before), out_file)
+        return out_file
+
+    def render_segments(self, ctx, targets):
+        """Single-decode mode: read the timeline once and feed every clip's encoder as it passes.
+
+        `targets` are ctx.targets() of this job's ranges. Overlapping ranges
+        (the backtracked last clip) simply have two encoders open at once,
+        so no frame is ever decoded twice. Gaps between targets (clips the
+        manifest skipped, energy or scene selected ranges) are seeked over
+        rather than decoded: each contiguous run is its own pass.
+        """
+        runs = []
+        for target in sorted(targets, key=lambda target: target[1]):
+            # Half a frame of slack so float rounding doesn't split back-to-back clips
+            if runs and target[1] - max(end for _, _, end, _ in runs[-1]) < 0.5 / self.out_fps:
+                runs[-1].append(target)
+            else:
+                runs.append([target])
+
+        # Progress counts clip frames (one per encoder fed), which is what the plan totals
+        on_frame, self.on_frame = self.on_frame, None
+        try:
+            for run in runs:
+                if ctx.stopped: break
+                self._render_run(ctx, run)
+        finally:
+            self.on_frame = on_frame
+
+    def _render_run(self, ctx, targets):
+        """One decode pass over contiguous or overlapping `targets` (see render_segments)."""
+        fps = self.out_fps
+        total = len(self.ranges)
+        base = min(start for _, start, _, _ in targets)
+        last_end = max(end for _, _, end, _ in targets)
+        # Frame windows on the shared timeline. Both ends are floored the same way and capped at
+        # what iter_frames yields (int(duration * fps)), so the last clip never waits for a frame
+        # the timeline doesn't have.
+        timeline_frames = int((last_end - base) * fps)
+        frame_at = lambda t: min(math.floor((t - base) * fps), timeline_frames)
+        windows = {i: (frame_at(start), frame_at(end) - frame_at(start), out_file)
+                   for i, start, end, out_file in targets}
+        # Each writer gets its target's own range (audio included), not the renderer's plan
+        spans = {i: (start, end) for i, start, end, _ in targets}
+
+        timeline = self.transform_video(self.source.subclipped(base, last_end), base)
+        writers = {}
+        # Telemetry: a shared frame's decode/crop/resize time is split between the clips using it
+        clip_stats = {} # i -> (started, {stage: seconds})
+        frames = timeline.iter_frames(fps=fps, dtype="uint8", logger=None)
+        exhausted = False
+        try:
+            for n in itertools.count():
+                before = self.timer.snapshot()
+                try:
+                    frame = next(frames, None)
+                except ffmpeg_tools.Cancelled:
+                    break
+                if frame is None:
+                    exhausted = True
+                    break
+                if ctx.stopped: break
+                active = [i for i, (first, count, _) in windows.items() if first <= n]
+                shared = {k: v / max(1, len(active)) for k, v in self.timer.since(before).items()}
+                ctx.frames(len(active))
+
+                for i in active:
+                    first, count, out_file = windows[i]
+                    if i not in writers:
+                        ctx.status(f"Exporting Clip {i+1}/{total}...")
+                        ctx.started(i, out_file)
+                        started, opened = time.perf_counter(), self.timer.snapshot()
+                        writers[i] = self.timer.call("audio", self._open_writer, *spans[i], out_file,
+                                                     (frame.shape[1], frame.shape[0]))
+                        clip_stats[i] = (started, self.timer.since(opened))
+                    stages = clip_stats[i][1]
+                    for k, v in shared.items():
+                        stages[k] = stages.get(k, 0.0) + v
+                    encode_started = time.perf_counter()
+                    writers[i][0].write_frame(frame)
+                    stages["encode"] = stages.get("encode", 0.0) + time.perf_counter() - encode_started
+                    if n + 1 >= first + count:
+                        self._close_segment_writer(writers.pop(i))
+                        del windows[i]
+                        started, stages = clip_stats.pop(i)
+                        ctx.finished(i, out_file, clip_record(time.perf_counter() - started, count, stages,
+                                                              out_file, rest="other"))
+
+                if not windows: break
+
+            if exhausted and windows and not ctx.stopped:
+                # The decoder ran dry early (a short read at the end of the source): these clips are incomplete
+                for i, (_, _, out_file) in windows.items():
+                    ctx.failed(i, out_file)
+                missing = ", ".join(str(i + 1) for i in sorted(windows))
+                raise RuntimeError(f"Source ended before clip(s) {missing} were complete")
+        finally:
+            # Writers still open here never got their last frame: kill them, RenderContext removes the files
+            for entry in writers.values():
+                self._abort_segment_writer(entry)
+            timeline.close()
+
+    def render_clip_pipelined(self, start, end, out_file, workers=PIPELINE_WORKERS):
+        """render_clip() with decode, crop/resize and encode overlapped (see pipeline.run_pipeline)."""
+        started = time.perf_counter()
+        if self.reframe is not None:
+            transform = FrameTransform(self.reframe.box, None, self.target_res_val)
+        else:
+            transform = FrameTransform(self.video.size, self.job.crop, self.target_res_val)
+        w, h = transform.size
+        entry = self._open_writer(start, end, out_file, (w, h))
+        audio_s = time.perf_counter() - started
+
+        count = int((end - start) * self.out_fps)
+        frames = self.source.subclipped(start, end).iter_frames(fps=self.out_fps, dtype="uint8", logger=None)
+        if self.reframe is not None:
+            # Window views are taken on the decoder thread; the transform pool copies them out
+            frames = (self.reframe(frame, start + k / self.out_fps) for k, frame in enumerate(frames))
+        try:
+            busy = run_pipeline(frames, transform, entry[0].write_frame, (h, w, 3), workers,
+                                stop_event=self.stop_event, on_frame=self.on_frame)
+        except BaseException as e:
+            if isinstance(e, ffmpeg_tools.Cancelled): self.saw_stop()
+            self._abort_segment_writer(entry)
+            raise
+        self._close_segment_writer(entry)
+        # Stages overlap here, so they are busy times and can add up to more than the wall time
+        self.stats = clip_record(time.perf_counter() - started, count, {"audio": audio_s, **busy}, out_file, rest="other")
+        return out_file
+
+    def _open_writer(self, start, end, out_file, size):
+        # Audio is cheap next to video, so each clip's track is written to a side
+        # file up front and muxed in by the video writer.
+        original = self.source.subclipped(start, end).audio
+        final_audio = self.build_audio(original, start, end) or original
+
+        audio_file = None
+        if final_audio is not None:
+            audio_file = temp_audio_file(out_file)
+            final_audio.write_audiofile(audio_file, fps=44100, codec="aac", bitrate=AUDIO_BITRATE, logger=None)
+
+        writer = FFMPEG_VideoWriter(
+            out_file, size, self.out_fps,
+            codec="libx264",
+            audiofile=audio_file,
+            preset=self.profile.preset,
+            bitrate=self.encode_bitrate,
+            threads=self.threads,
+            ffmpeg_params=self.ffmpeg_params,
+        )
+        return writer, audio_file
+
+    def _close_segment_writer(self, entry):
+        writer, audio_file = entry
+        writer.close()
+        if audio_file and os.path.exists(audio_file):
+            os.remove(audio_file)
+
+    def _abort_segment_writer(self, entry):
+        writer, audio_file = entry
+        writer.proc.kill()
+        writer.proc.communicate()
+        if audio_file and os.path.exists(audio_file):
+            os.remove(audio_file)
+
+    def close(self):
+        self.video.close()
+        if self.bg_audio is not None:
+            self.bg_audio.close()
+
+
+def split_cpu_budget(cpu_budget, clip_count, workers=None):
+    """Divide `cpu_budget` cores between clip workers and x264 threads -> (workers, threads)."""
+    cpu_budget = max(1, int(cpu_budget or os.cpu_count() or 1))
+    if workers is None:
+        # x264 stops scaling well past a few threads per encode, so spend the
+        # rest of the budget on more clips in flight.
+        workers = cpu_budget // ENCODER_THREADS
+    workers = max(1, min(int(workers), clip_count, cpu_budget))
+    threads = max(1, cpu_budget // workers)
+    return workers, threads
+
+
+class RenderContext:
+    """Plumbing shared by every render path: progress text, abort, output names and per-clip state.
+
+    `names` maps clip index -> file name (default: content addressed names,
+    see clip_identity()), `only` limits the render to those indices and
+    `on_clip(i, state, out_file)` hears "rendering", "done" and "failed".
+    Clips the output folder's manifest already holds are reported "done"
+    without rendering, unless `force` is set. Outputs of clips that started
+    but never finished are deleted by cleanup(), or moved to PARTIAL_DIR
+    with `partial="quarantine"`. `progress` (a progress.ProgressChannel)
+    gets a "plan" event with the frame total and frame counts as they render.
+    """
+    def __init__(self, job, status=None, stop_event=None, names=None, only=None, on_clip=None, force=False,
+                 partial="delete", progress=None):
+        self.job = job
+        self.status = status or (lambda msg: None)
+        self.stop_event = stop_event or threading.Event()
+        self.names = names
+        self.only = only
+        self.on_clip = on_clip or (lambda i, state, out_file: None)
+        self.force = force
+        self.pipeline = "moviepy" # set by render() once the path is known
+        self.profile = PROFILES["balanced"] # likewise, see resolve_profile()
+        self.manifest = RenderManifest(job.output_dir)
+        self.fingerprints = {}
+        self.identities = {} # i -> (clip_id, start, end)
+        self.written = {}
+        self.skipped = set()
+        self.out_fps = None # for frame counts of clips whose path can't count them itself
+        self.telemetry = RenderTelemetry(None, job)
+        self.clip_started = {}
+        self.partial = partial
+        self.in_flight = {} # i -> out_file, started and not finished yet
+        self.stop_seen = None # when the render first noticed the abort
+        self.progress = progress
+        self.counts_frames = True # False: the path can't count frames, finished() reports whole clips
+
+    @property
+    def stopped(self):
+        if self.stop_event.is_set():
+            self.cancelled()
+            return True
+        return False
+
+    def cancelled(self, seen=None):
+        """Note the abort; `seen` is when a renderer first noticed it, if earlier than now."""
+        if self.stop_seen is None:
+            self.stop_seen = seen or time.perf_counter()
+
+    def frames(self, n=1):
+        if self.progress is not None:
+            self.progress.frames(n)
+
+    def clip_frames(self, start, end):
+        return int((end - start) * self.out_fps) if self.out_fps else None
+
+    def fingerprint(self, path):
+        if path not in self.fingerprints:
+            self.fingerprints[path] = content_fingerprint(path)
+        return self.fingerprints[path]
+
+    def targets(self, ranges):
+        """-> [(i, start, end, out_file)] for the clips this render still has to produce."""
+        targets = []
+        for i, (start, end) in enumerate(ranges):
+            if self.only is not None and i not in self.only: continue
+            clip_id = clip_identity(self.job, start, end, self.pipeline, self.fingerprint, self.profile)
+            self.identities[i] = (clip_id, start, end)
+
+            existing = None if self.force else self.manifest.lookup(clip_id)
+            if existing:
+                if i not in self.skipped:
+                    self.skipped.add(i)
+                    self.written[i] = existing
+                    self.on_clip(i, "done", existing)
+                continue
+
+            name = self.names[i] if self.names is not None else clip_filename(self.job.video_path, i, clip_id)
+            targets.append((i, start, end, os.path.join(self.job.output_dir, name)))
+
+        if self.skipped:
+            self.status(f"{len(self.skipped)} clip(s) unchanged, skipping.")
+        if self.progress is not None:
+            self.progress.post("plan", clips=len(targets),
+                               frames=sum(self.clip_frames(start, end) or 0 for _, start, end, _ in targets))
+        return targets
+
+    def started(self, i, out_file):
+        self.clip_started[i] = time.perf_counter()
+        self.in_flight[i] = out_file
+        self.on_clip(i, "rendering", out_file)
+
+    def finished(self, i, out_file, stats=None):
+        """`stats` is the clip's telemetry record; without one, wall time since started() is
+        booked to the pipeline as a whole."""
+        self.in_flight.pop(i, None)
+        self.written[i] = out_file
+        clip_id, start, end = self.identities[i]
+        self.manifest.record(clip_id, out_file, clip=i + 1, start=start, end=end, source=self.job.video_path)
+        if not self.counts_frames:
+            self.frames(self.clip_frames(start, end) or 0)
+        if stats is None:
+            frames = self.clip_frames(start, end)
+            stats = clip_record(time.perf_counter() - self.clip_started.get(i, time.perf_counter()), frames, {},
+                                out_file, rest=self.pipeline)
+        self.telemetry.record(i + 1, start, end, out_file, stats)
+        self.on_clip(i, "done", out_file)
+
+    def failed(self, i, out_file):
+        self.telemetry.failed += 1
+        self.on_clip(i, "failed", out_file)
+
+    def cleanup(self):
+        """Remove (or quarantine) what unfinished clips left behind -> number of partial outputs."""
+        count = 0
+        for out_file in self.in_flight.values():
+            if os.path.exists(temp_audio_file(out_file)):
+                try:
+                    os.remove(temp_audio_file(out_file))
+                except OSError: pass
+            if not os.path.exists(out_file): continue
+            try:
+                if self.partial == "quarantine":
+                    quarantine = os.path.join(self.job.output_dir, PARTIAL_DIR)
+                    os.makedirs(quarantine, exist_ok=True)
+                    os.replace(out_file, os.path.join(quarantine, os.path.basename(out_file)))
+                else:
+                    os.remove(out_file)
+                count += 1
+            except OSError as e:
+                self.status(f"Could not remove partial file {os.path.basename(out_file)}: {e}")
+        self.in_flight.clear()
+        return count
+
+    def results(self):
+        return [self.written[i] for i in sorted(self.written)]
+
+
+def render_pipeline(job, backend="moviepy"):
+    """-> (pipeline, probe info). pipeline is the path render() takes: "keyframe" or
+    "smart" (stream copy, with the probe it qualified on), "ffmpeg", "pipelined" or "moviepy"."""
+    if needs_reencode(job) is False:
+        info = ffmpeg_tools.probe(job.video_path)
+        if info["duration"] and info["duration"] >= job.duration and ffmpeg_tools.can_stream_copy(info):
+            return job.stream_copy, info
+    if backend == "ffmpeg" and reframes(job):
+        # A time-varying crop can't be expressed as one native filter chain
+        backend = "moviepy"
+    return (backend if backend in ("ffmpeg", "pipelined") else "moviepy"), None
+
+
+def resolve_profile(job, threads=ENCODER_THREADS, status=None, stop_event=None):
+    """EncoderProfile for `job`. "auto" encodes a sample of the source with the job's
+    geometry once and caches the pick per source, geometry and quality floor
+    (`stop_event` aborts the tuning encodes with ffmpeg_tools.Cancelled)."""
+    if job.encoder != "auto":
+        return PROFILES.get(job.encoder, PROFILES["balanced"])
+
+    info = cached_probe(job.video_path)
+    target_res_val, _, out_fps = export_settings(job.resolution, job.fps, info["fps"])
+    vf = ffmpeg_tools.geometry_filter(render_geometry(info["size"], job.crop, target_res_val),
+                                      None if job.fps == "Source" else out_fps)
+    key = hashlib.sha1(f"{source_key(job.video_path)}|{vf}|{job.min_ssim}|{threads}".encode("utf-8")).hexdigest()
+    entry = os.path.join(cache_dir("autotune"), key + ".json")
+    if os.path.exists(entry):
+        try:
+            with open(entry) as f:
+                return EncoderProfile(**json.load(f)["profile"])
+        except (OSError, ValueError, KeyError, TypeError): pass
+
+    # Sample from the middle: intros and outros are often static and easy to encode
+    sample = min(AUTOTUNE_SECONDS, info["duration"])
+    start = max(0.0, info["duration"] / 2 - sample / 2)
+    profile, measurements = auto_tune(job.video_path, start, sample, vf, threads, job.min_ssim, status, stop_event)
+    atomic_write_json(entry, {"profile": profile.settings(), "measurements": measurements}, indent=1)
+    return profile
+
+
+def render(job, status=None, stop_event=None, workers=1, cpu_budget=None, single_decode=False, backend="moviepy",
+           names=None, only=None, on_clip=None, force=False, telemetry=True, partial="delete", progress=None,
+           estimate=None):
+    """Cut `job.video_path` into clips. Returns the list of written files in clip order.
+
+    `status` receives human readable progress strings, `stop_event` (a
+    threading.Event) aborts within a few frames. `workers` > 1 (or None for
+    automatic) exports clips in parallel worker processes sharing
+    `cpu_budget` cores (default: all of them). `single_decode` instead
+    decodes the source once and feeds all clip encoders from that pass.
+    `backend="ffmpeg"` runs crop/pad/scale/fps as a native filter chain
+    (single_decode does not apply there); `backend="pipelined"` renders
+    clips one after another with decode, transform and encode overlapped
+    on threads. `names`, `only`, `on_clip` and
+    `force` are described on RenderContext, as is `partial` ("delete" or
+    "quarantine" for aborted outputs) and `progress`. `telemetry` is a folder for the
+    per-clip JSON Lines and run summary (see telemetry.py), True for the
+    default one or False for none. An `estimate` (see estimate.py) is
+    stored with the telemetry and compared against the actual run; the
+    run summary is posted to `progress` as a "summary" event either way.
+    """
+    ctx = RenderContext(job, status, stop_event, names, only, on_clip, force, partial, progress)
+    ctx.pipeline, info = render_pipeline(job, backend)
+    directory = telemetry_dir() if telemetry is True else telemetry or None
+    ctx.telemetry = RenderTelemetry(directory, job, ctx.pipeline)
+    ctx.telemetry.estimate = estimate
+    try:
+        _render(ctx, info, workers, cpu_budget, single_decode)
+    except ffmpeg_tools.Cancelled:
+        # Stopped before any clip loop saw it (an analysis pass or encoder tuning)
+        ctx.cancelled()
+    except KeyboardInterrupt:
+        ctx.cancelled()
+        raise
+    finally:
+        partial_count = ctx.cleanup()
+        if ctx.stop_event.is_set() or ctx.stop_seen is not None:
+            ctx.cancelled()
+            idle = time.perf_counter() - ctx.stop_seen
+            ctx.telemetry.cancel = {"abort_to_idle_s": round(idle, 3), "partial_files": partial_count}
+            ctx.status(f"Stopped: {partial_count} partial file(s) {'quarantined' if partial == 'quarantine' else 'removed'}, "
+                       f"idle {idle:.2f}s after abort.")
+        ctx.telemetry.skipped = len(ctx.skipped)
+        summary = ctx.telemetry.finish()
+        if progress is not None:
+            progress.flush()
+            progress.post("summary", **summary)
+    return ctx.results()
+
+
+def _render(ctx, info, workers, cpu_budget, single_decode):
+    job = ctx.job
+    # Analysed (or loaded) once up front with progress and abort; every path and worker below hits the cache
+    if job.boundaries == "scenes":
+        scene_cuts(job.video_path, ctx.status, ctx.stop_event)
+    if reframes(job):
+        subject_path(job.video_path, ctx.status, ctx.stop_event)
+    if job.selection == "energy" or job.normalize_db is not None:
+        audio_envelope(job.video_path, ctx.status, ctx.stop_event)
+        if job.normalize_db is not None and job.audio_mode != "original" and job.audio_path:
+            audio_envelope(job.audio_path, ctx.status, ctx.stop_event)
+
+    if info is not None:
+        _render_stream_copy(ctx, info)
+        return
+    ctx.profile = resolve_profile(job, ENCODER_THREADS if cpu_budget is None else max(1, int(cpu_budget)), ctx.status,
+                                  ctx.stop_event)
+    ctx.telemetry.settings["profile"] = ctx.profile.settings()
+
+    if ctx.pipeline == "ffmpeg":
+        _render_ffmpeg(ctx, workers, cpu_budget)
+        return
+
+    # The plan only needs the duration, which the cached probe has without starting a reader. Resolving
+    # the targets before any ClipRenderer exists keeps an unchanged rerun from opening the source
+    # for decoding or loading the background track.
+    info = cached_probe(job.video_path)
+    ranges = job_ranges(job, info["duration"], ctx.status, ctx.stop_event)[0]
+    ctx.out_fps = export_settings(job.resolution, job.fps, info["fps"])[2]
+
+    targets = ctx.targets(ranges)
+    if not targets: return
+    threads = ENCODER_THREADS if cpu_budget is None else max(1, int(cpu_budget))
+
+    if ctx.pipeline == "pipelined":
+        _render_sequential(ctx, targets, len(ranges), threads, pipelined=True)
+        return
+
+    if single_decode:
+        _render_single_decode(ctx, targets, threads)
+        return
+
+    if workers != 1:
+        workers, threads = split_cpu_budget(cpu_budget, len(targets), workers)
+    if workers == 1:
+        _render_sequential(ctx, targets, len(ranges), threads)
+    else:
+        _render_parallel(ctx, targets, len(ranges), workers, threads)
+
+
+def _render_sequential(ctx, targets, total, threads, pipelined=False):
+    renderer = ClipRenderer(ctx.job, threads, ctx.profile, ctx.stop_event, ctx.frames)
+    render_clip = renderer.render_clip_pipelined if pipelined else renderer.render_clip
+    try:
+        for i, start, end, out_file in targets:
+            if ctx.stopped: break
+            ctx.status(f"Exporting Clip {i+1}/{total}...")
+            ctx.started(i, out_file)
+            try:
+                render_clip(start, end, out_file)
+            except ffmpeg_tools.Cancelled:
+                ctx.cancelled(renderer.stop_seen)
+                break
+            except Exception:
+                ctx.failed(i, out_file)
+                raise
+            ctx.finished(i, out_file, renderer.stats)
+    finally:
+        renderer.close()
+
+
+def _render_single_decode(ctx, targets, threads):
+    renderer = ClipRenderer(ctx.job, threads, ctx.profile, ctx.stop_event, ctx.frames)
+    try:
+        renderer.render_segments(ctx, targets)
+    finally:
+        renderer.close()
+
+
+# --- Stream Copy Fast Path ---
+def needs_reencode(job):
+    """False when the job only cuts the source in time (no crop, scale, fps or audio change)."""
+    if job.stream_copy == "off": return True
+    if job.crop is not None or job.resolution != "Original" or job.fps != "Source": return True
+    if job.normalize_db is not None: return True
+    # mix/background without a track still keep the original audio
+    return job.audio_mode != "original" and bool(job.audio_path)
+
+
+def _render_stream_copy(ctx, info):
+    job = ctx.job
+    # Looped sources never get here (duration >= clip length), so ranges are plain source times.
+    ranges = job_ranges(job, info["duration"], ctx.status, ctx.stop_event)[0]
+    keyframes = keyframe_index(job.video_path, info) if job.stream_copy == "smart" else None
+    ctx.out_fps = info["fps"]
+    ctx.counts_frames = False
+
+    total = len(ranges)
+    for i, start, end, out_file in ctx.targets(ranges):
+        if ctx.stopped: break
+        ctx.status(f"Copying Clip {i+1}/{total}...")
+        ctx.started(i, out_file)
+        try:
+            if keyframes is None:
+                ffmpeg_tools.copy_cut(job.video_path, start, end, out_file)
+            else:
+                ffmpeg_tools.smart_cut(job.video_path, start, end, out_file, keyframes, info)
+        except Exception:
+            ctx.failed(i, out_file)
+            raise
+        ctx.finished(i, out_file)
+
+
+# --- Native ffmpeg Backend ---
+class _EitherEvent:
+    """Looks set once any of `events` is (run_ffmpeg only ever calls is_set())."""
+    def __init__(self, *events):
+        self.events = events
+
+    def is_set(self):
+        return any(e.is_set() for e in self.events)
+
+
+def _render_ffmpeg(ctx, workers, cpu_budget):
+    job = ctx.job
+    info = ffmpeg_tools.probe(job.video_path)
+    if not info["duration"] or not info["size"]:
+        raise RuntimeError(f"Could not read video stream of {job.video_path}")
+
+    ranges, loops, _ = job_ranges(job, info["duration"], ctx.status, ctx.stop_event)
+    target_res_val, bitrate, out_fps = export_settings(job.resolution, job.fps, info["fps"])
+    geo = render_geometry(info["size"], job.crop, target_res_val)
+    vf = ffmpeg_tools.geometry_filter(geo, None if job.fps == "Source" else out_fps)
+    ctx.out_fps = out_fps
+
+    total = len(ranges)
+    targets = ctx.targets(ranges)
+    if not targets: return
+    if workers == 1:
+        threads = ENCODER_THREADS if cpu_budget is None else max(1, int(cpu_budget))
+    else:
+        workers, threads = split_cpu_budget(cpu_budget, len(targets), workers)
+
+    # One failed clip stops its siblings too, without touching the caller's stop event
+    failed = threading.Event()
+    stop = _EitherEvent(ctx.stop_event, failed)
+
+    def encode(target):
+        i, start, end, out_file = target
+        if ctx.stopped or failed.is_set(): return None
+        ctx.started(i, out_file)
+        # Looped timeline -> position inside the source; the input loops from there
+        start_in_src = start % info["duration"] if loops > 1 else start
+        return ffmpeg_tools.encode_clip(
+            job.video_path, start_in_src, end - start, out_file, vf, ctx.profile.video_args(bitrate, threads),
+            audio_mode=job.audio_mode, bg_path=job.audio_path,
+            source_audio=info["audio_codec"] is not None, loop_source=loops > 1,
+            bg_gain_db=job.bg_gain_db, original_gain_db=job.original_gain_db, duck_db=job.duck_db,
+            gain_db=output_gain_db(job, start, end) if job.normalize_db is not None else 0.0,
+            stop_event=stop, on_frames=ctx.frames)
+
+    done = 0
+    # Each clip is its own ffmpeg process, so plain threads are enough to run several at once.
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(encode, target): target for target in targets}
+        for fut in as_completed(futures):
+            i, _, _, out_file = futures[fut]
+            try:
+                written = fut.result()
+            except ffmpeg_tools.Cancelled:
+                ctx.cancelled()
+                continue
+            except Exception:
+                ctx.failed(i, out_file)
+                failed.set() # running encoders are killed at their next progress report
+                for other in futures: other.cancel()
+                raise
+            if written:
+                ctx.finished(i, written)
+                done += 1
+                ctx.status(f"Exported Clip {done}/{len(targets)}...")
+            if ctx.stopped:
+                for other in futures: other.cancel()
+
+
+# --- Parallel Export ---
+# Each pool process keeps its own ClipRenderer (MoviePy readers can't be shared).
+_worker_renderer = None
+_worker_stop = None
+_worker_frames = None
+_worker_started = None
+
+
+def _count_worker_frame():
+    with _worker_frames.get_lock():
+        _worker_frames.value += 1
+
+
+def _init_worker(job, threads, profile, stop_flag, frame_counter, started_flags):
+    global _worker_renderer, _worker_stop, _worker_frames, _worker_started
+    _worker_stop = stop_flag
+    _worker_frames = frame_counter
+    _worker_started = started_flags
+    _worker_renderer = ClipRenderer(job, threads, profile, stop_flag, _count_worker_frame)
+    atexit.register(_worker_renderer.close)
+
+
+def _worker_render(slot, i, start, end, out_file):
+    if _worker_stop.is_set():
+        return i, None, None
+    # Set before the output file exists, so the parent only cleans up clips a worker really began
+    _worker_started[slot] = 1
+    try:
+        written = _worker_renderer.render_clip(start, end, out_file)
+    except ffmpeg_tools.Cancelled:
+        # The parent removes the partial file once the pool is down
+        return i, None, None
+    return i, written, _worker_renderer.stats
+
+
+def _render_parallel(ctx, targets, total, workers, threads):
+    # Names are fixed up front (ctx.targets) so output order doesn't depend on which worker finishes first.
+    # spawn: same behaviour on Windows (the packaged app) and Linux render hosts
+    mp_ctx = multiprocessing.get_context("spawn")
+    stop_flag = mp_ctx.Event()
+    frame_counter = mp_ctx.Value("q", 0) # frames rendered by all workers, forwarded to ctx.progress
+    started_flags = mp_ctx.Array("b", len(targets), lock=False) # per target: a worker has begun it
+    marked = set()
+    reported = 0
+    done = 0
+
+    def mark_started():
+        # Queued clips are not in flight: only these may be reported "rendering" or cleaned up
+        for slot, (i, _, _, out_file) in enumerate(targets):
+            if slot not in marked and started_flags[slot]:
+                marked.add(slot)
+                ctx.started(i, out_file)
+
+    ctx.status(f"Exporting {len(targets)} of {total} clips on {workers} workers x {threads} threads...")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp_ctx, initializer=_init_worker,
+                               initargs=(ctx.job, threads, ctx.profile, stop_flag, frame_counter, started_flags))
+    try:
+        pending = {}
+        for slot, (i, start, end, out_file) in enumerate(targets):
+            pending[pool.submit(_worker_render, slot, i, start, end, out_file)] = (i, out_file)
+        while pending:
+            finished, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            mark_started()
+            count = frame_counter.value
+            if count > reported:
+                ctx.frames(count - reported)
+                reported = count
+            for fut in finished:
+                i, out_file = pending.pop(fut)
+                if fut.cancelled(): continue
+                try:
+                    _, written, stats = fut.result()
+                except Exception:
+                    ctx.failed(i, out_file)
+                    raise
+                if written:
+                    ctx.finished(i, written, stats)
+                    done += 1
+                    ctx.status(f"Exported Clip {done}/{len(targets)}...")
+
+            if ctx.stopped and not stop_flag.is_set():
+                # One Abort stops every worker: queued clips are dropped,
+                # running ones stop at their next frame.
+                stop_flag.set()
+                for fut in pending: fut.cancel()
+    except BaseException:
+        stop_flag.set()
+        raise
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        # Clips a worker began after the last poll still need their partial output cleaned up
+        mark_started()
+
+
+# --- Command Line ---
+def add_job_arguments(parser):
+    """Arguments describing a RenderJob (shared with the job queue CLI)."""
+    parser.add_argument("video", help="Source video file")
+    parser.add_argument("-o", "--output", required=True, help="Target folder")
+    parser.add_argument("-d", "--duration", type=float, default=60.0, help="Clip duration in seconds (default: 60)")
+    parser.add_argument("-n", "--count", type=int, default=None, help="Number of clips (default: as many as fit)")
+    parser.add_argument("--crop", type=float, nargs=4, metavar=("X", "Y", "W", "H"), default=None,
+                        help="Crop box in source pixels; may extend past the frame (black padding)")
+    parser.add_argument("--audio-mode", choices=AUDIO_MODES, default="mix")
+    parser.add_argument("--audio", default="", help="Background audio file")
+    parser.add_argument("--bg-gain", type=float, default=0.0, help="Background track gain in dB")
+    parser.add_argument("--original-gain", type=float, default=0.0, help="Source audio gain in dB (mix mode)")
+    parser.add_argument("--duck", type=float, default=0.0,
+                        help="Lower the background by this many dB while the source audio is active (mix mode)")
+    parser.add_argument("--resolution", choices=list(RESOLUTIONS), default="Original")
+    parser.add_argument("--fps", choices=FPS_CHOICES, default="Source")
+    parser.add_argument("--encoder", choices=ENCODER_CHOICES, default="balanced",
+                        help="Encoding profile; auto = fastest settings meeting --min-ssim on a sample of the source")
+    parser.add_argument("--min-ssim", type=float, default=MIN_SSIM, help=f"Quality floor for --encoder auto (default: {MIN_SSIM})")
+    parser.add_argument("--boundaries", choices=BOUNDARY_MODES, default="fixed",
+                        help="scenes = move clip starts/ends onto the nearest shot cut (analysed once per source)")
+    parser.add_argument("--snap-tolerance", type=float, default=SNAP_TOLERANCE,
+                        help=f"Seconds a boundary may move to reach a cut (default: {SNAP_TOLERANCE})")
+    parser.add_argument("--reframe", choices=REFRAME_MODES, default="off",
+                        help="auto = move the --crop box with the subject over time (analysed once per source)")
+    parser.add_argument("--selection", choices=SELECTION_MODES, default="sequential",
+                        help="energy = export the loudest, most active stretches instead of the first ones")
+    parser.add_argument("--normalize", type=float, nargs="?", const=TARGET_DB, default=None, metavar="DB",
+                        help=f"Bring every clip's audio to this loudness (default when given: {TARGET_DB} dB)")
+    parser.add_argument("--stream-copy", choices=["off", "keyframe", "smart"], default="smart",
+                        help="Cut without re-encoding when nothing but time changes (default: smart, frame exact)")
+
+
+def add_render_arguments(parser):
+    """Arguments for how a job is executed (see render())."""
+    parser.add_argument("--backend", choices=["moviepy", "ffmpeg", "pipelined"], default="moviepy",
+                        help="ffmpeg = native crop/pad/scale filter chain, frames never pass through Python; "
+                             "pipelined = decode, crop/resize and encode overlapped on threads")
+    parser.add_argument("--single-decode", action="store_true",
+                        help="Decode the source once and feed every clip encoder from that pass")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="Clips exported in parallel; 0 = pick from the CPU budget (default: 1)")
+    parser.add_argument("--cpu-budget", type=int, default=None,
+                        help="Cores shared by workers and encoder threads (default: all)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-render clips the output folder's manifest already has")
+    parser.add_argument("--telemetry", default=None, metavar="DIR",
+                        help="Folder for per-clip JSON Lines + run summary (default: ~/.proclipstudio/telemetry)")
+    parser.add_argument("--no-telemetry", action="store_true", help="Don't record render telemetry")
+    parser.add_argument("--keep-partial", action="store_true",
+                        help=f"Move outputs of aborted clips to {PARTIAL_DIR}/ in the output folder instead of deleting them")
+
+
+def render_options(args):
+    """render() keyword arguments from parsed add_render_arguments() flags."""
+    return {
+        "workers": args.workers or None,
+        "cpu_budget": args.cpu_budget,
+        "single_decode": args.single_decode,
+        "backend": args.backend,
+        "force": args.force,
+        "telemetry": False if args.no_telemetry else args.telemetry or True,
+        "partial": "quarantine" if args.keep_partial else "delete",
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="ProClip Studio headless renderer")
+    add_job_arguments(parser)
+    add_render_arguments(parser)
+    return parser
+
+
+def job_from_args(args):
+    if args.duration <= 0:
+        raise ValueError("Invalid Duration.")
+    if args.count is not None and args.count < 1:
+        raise ValueError("Clip count must be at least 1.")
+    return RenderJob(
+        video_path=args.video,
+        output_dir=args.output,
+        duration=args.duration,
+        crop=tuple(args.crop) if args.crop else None,
+        count=args.count,
+        audio_mode=args.audio_mode,
+        audio_path=args.audio,
+        resolution=args.resolution,
+        fps=args.fps,
+        stream_copy=args.stream_copy,
+        bg_gain_db=args.bg_gain,
+        original_gain_db=args.original_gain,
+        duck_db=args.duck,
+        encoder=args.encoder,
+        min_ssim=args.min_ssim,
+        boundaries=args.boundaries,
+        snap_tolerance=args.snap_tolerance,
+        reframe=args.reframe,
+        selection=args.selection,
+        normalize_db=args.normalize,
+    )
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        job = job_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    os.makedirs(job.output_dir, exist_ok=True)
+    stop_event = threading.Event()
+    try:
+        written = render(job, status=print, stop_event=stop_event, **render_options(args))
+    except KeyboardInterrupt:
+        stop_event.set()
+        print("Stopped.")
+        return 130
+
+    for path in written:
+        print(path)
+    print(f"Generated {len(written)} clips.")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import hashlib
+import tempfile
+import statistics
+
+import ffmpeg_tools
+from engine import (AUDIO_BITRATE, ENCODER_THREADS, add_job_arguments, add_render_arguments, clip_identity,
+                    export_settings, job_from_args, job_ranges, render, render_geometry, render_options,
+                    render_pipeline, resolve_profile, split_cpu_budget)
+from encoding import PROFILES
+from manifest import RenderManifest
+from media_cache import atomic_write_json, cache_dir, cached_probe, content_fingerprint, source_key
+from progress import ProgressChannel
+from telemetry import RUNS_FILE, telemetry_dir
+
+CALIBRATE_SECONDS = 3.0 # source seconds encoded natively to measure this machine's throughput
+HISTORY_RUNS = 20 # recent finished runs of the same mode the correction factor is learned from
+# Cost of a mode relative to the native calibration encode, used until telemetry has history for it
+MODE_FACTORS = {"ffmpeg": 1.0, "pipelined": 1.8, "moviepy": 2.5, "moviepy+single": 2.0}
+STREAM_COPY_CLIP_S = 0.5 # "keyframe" / "smart" clips are I/O bound: a flat per-clip cost
+
+
+def _bits(rate):
+    """"8000k" -> 8000000"""
+    return float(rate[:-1]) * 1000 if rate.endswith("k") else float(rate)
+
+
+def calibrate(job, info, vf, video_args, status=None, stop_event=None):
+    """Encode CALIBRATE_SECONDS from the middle of the source with the job's filter and encoder
+    settings -> {"fps", "video_bytes_per_s"}. Cached per source, filter and encoder settings."""
+    key = hashlib.sha1(f"{source_key(job.video_path)}|{vf}|{' '.join(video_args)}".encode("utf-8")).hexdigest()
+    entry = os.path.join(cache_dir("estimate"), key + ".json")
+    if os.path.exists(entry):
+        try:
+            with open(entry) as f:
+                return json.load(f)
+        except (OSError, ValueError): pass
+
+    if status:
+        status("Estimating: measuring encode speed on a sample...")
+    sample = min(CALIBRATE_SECONDS, info["duration"])
+    start = max(0.0, info["duration"] / 2 - sample / 2)
+    tmp_dir = tempfile.mkdtemp(prefix="proclip-estimate-")
+    try:
+        out = os.path.join(tmp_dir, "sample.mp4")
+        frames = []
+        started = time.perf_counter()
+        ffmpeg_tools.run_ffmpeg(["-y", "-ss", f"{start:.6f}", "-i", job.video_path, "-t", f"{sample:.6f}",
+                                 "-map", "0:v:0", "-an", "-vf", vf] + video_args + ["-pix_fmt", "yuv420p", out],
+                                stop_event, frames.append)
+        elapsed = time.perf_counter() - started
+        result = {"fps": round(sum(frames) / max(elapsed, 1e-6), 2),
+                  "video_bytes_per_s": round(os.path.getsize(out) / sample)}
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    atomic_write_json(entry, result)
+    return result
+
+
+def history_factor(mode, workers, directory=None):
+    """Median of actual / predicted wall time over recent finished runs of `mode`, None without history."""
+    path = os.path.join(directory or telemetry_dir(), RUNS_FILE)
+    if not os.path.exists(path): return None
+    ratios = []
+    with open(path) as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            est = run.get("estimate")
+            if not est or run.get("cancel") or run.get("failed") or not run.get("clips"): continue
+            if est.get("mode") != mode or est.get("workers") != workers or not est.get("raw_wall_s"): continue
+            # Only the clips that were actually rendered count (unchanged ones are skipped in both)
+            ratios.append(run["wall_s"] / est["raw_wall_s"])
+    ratios = ratios[-HISTORY_RUNS:]
+    return statistics.median(ratios) if ratios else None
+
+
+def estimate_render(job, workers=1, cpu_budget=None, single_decode=False, backend="moviepy", force=False,
+                    telemetry=True, status=None, stop_event=None, **_):
+    """Predicted cost of render(job, ...) with the same options -> estimate dict.
+
+    Works on the clip plan render() would use (looping and backtracking
+    included, unchanged clips in the output manifest skipped unless
+    `force`). Throughput comes from a short native encode of the source on
+    this machine (calibrate), scaled per render mode by what earlier runs
+    measured against their estimates (history_factor). Keys: wall_s,
+    bytes, frames and clips ([{clip, start, end, frames, wall_s, bytes}]),
+    plus what the prediction was based on. Extra keyword arguments are
+    accepted so render_options() can be passed straight through. Setting
+    `stop_event` aborts analysis, tuning and calibration (ffmpeg_tools.Cancelled).
+    """
+    status = status or (lambda msg: None)
+    info = cached_probe(job.video_path)
+    pipeline, copy_info = render_pipeline(job, backend)
+    ranges, loops, _ = job_ranges(job, info["duration"], status, stop_event)
+    target_res_val, bitrate, out_fps = export_settings(job.resolution, job.fps, info["fps"])
+    geo = render_geometry(info["size"], job.crop, target_res_val)
+
+    manifest = RenderManifest(job.output_dir)
+    fingerprints = {}
+
+    def fingerprint(path):
+        if path not in fingerprints:
+            fingerprints[path] = content_fingerprint(path)
+        return fingerprints[path]
+
+    threads = ENCODER_THREADS if cpu_budget is None else max(1, int(cpu_budget))
+    profile = PROFILES["balanced"] if copy_info is not None else resolve_profile(job, threads, status, stop_event)
+    mode = pipeline + ("+single" if pipeline == "moviepy" and single_decode else "")
+
+    pending = []
+    for i, (start, end) in enumerate(ranges):
+        if not force and manifest.lookup(clip_identity(job, start, end, pipeline, fingerprint, profile)):
+            continue
+        pending.append((i, start, end))
+
+    # Same split as render(): only the per-clip moviepy and ffmpeg paths run clips side by side
+    if copy_info is not None or mode in ("pipelined", "moviepy+single") or workers == 1 or not pending:
+        workers = 1
+    else:
+        workers, threads = split_cpu_budget(cpu_budget, len(pending), workers)
+
+    audio = bool(info["audio_codec"]) or (job.audio_mode != "original" and bool(job.audio_path))
+    audio_bytes_per_s = _bits(AUDIO_BITRATE) / 8 if audio else 0
+    if copy_info is not None:
+        calibration = None
+        video_bytes_per_s = os.path.getsize(job.video_path) / info["duration"]
+        clip_wall = lambda frames: STREAM_COPY_CLIP_S
+        audio_bytes_per_s = 0
+    else:
+        vf = ffmpeg_tools.geometry_filter(geo, None if job.fps == "Source" else out_fps)
+        calibration = calibrate(job, info, vf, profile.video_args(bitrate, threads), status, stop_event)
+        video_bytes_per_s = calibration["video_bytes_per_s"] if profile.crf is not None else _bits(bitrate) / 8
+        clip_wall = lambda frames: frames / max(calibration["fps"], 1e-3) * MODE_FACTORS.get(mode, 1.0)
+
+    clips = []
+    for i, start, end in pending:
+        frames = int((end - start) * out_fps)
+        clips.append({"clip": i + 1, "start": start, "end": end, "frames": frames,
+                      "wall_s": clip_wall(frames), "bytes": int((end - start) * (video_bytes_per_s + audio_bytes_per_s))})
+
+    # Parallel workers split the clips between them; the calibration encode already ran with their thread count
+    raw_wall = sum(c["wall_s"] for c in clips) / workers
+    directory = telemetry_dir() if telemetry is True else telemetry or None
+    factor = history_factor(mode, workers, directory) if directory else None
+    for c in clips:
+        c["wall_s"] = round(c["wall_s"] * (factor or 1.0), 3)
+    return {
+        "mode": mode,
+        "workers": workers,
+        "threads": threads,
+        "loops": loops,
+        "size": list(geo["size"]),
+        "out_fps": out_fps,
+        "planned": len(ranges),
+        "skipped": len(ranges) - len(pending),
+        "frames": sum(c["frames"] for c in clips),
+        "raw_wall_s": round(raw_wall, 3),
+        "history_factor": round(factor, 3) if factor else None,
+        "wall_s": round(raw_wall * (factor or 1.0), 3),
+        "bytes": sum(c["bytes"] for c in clips),
+        "calibration": calibration,
+        "clips": clips,
+    }
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    h, rest = divmod(seconds, 3600)
+    return f"{h}:{rest // 60:02d}:{rest % 60:02d}" if h else f"{rest // 60}:{rest % 60:02d}"
+
+
+def format_bytes(n):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024 or unit == "GiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def describe(estimate):
+    """One line for the status bar / console."""
+    clips = len(estimate["clips"])
+    skipped = f", {estimate['skipped']} unchanged" if estimate["skipped"] else ""
+    return (f"Estimate: {clips} clip(s){skipped}, ~{format_duration(estimate['wall_s'])}, "
+            f"~{format_bytes(estimate['bytes'])}")
+
+
+def free_space(directory):
+    """Free bytes on the volume `directory` is on (or will be created on)."""
+    path = os.path.abspath(directory)
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return shutil.disk_usage(path).free
+
+
+def space_warning(estimate, directory):
+    """Warning line when the estimated output doesn't fit in `directory`, else None."""
+    free = free_space(directory)
+    if estimate["bytes"] <= free: return None
+    return (f"Not enough disk space: ~{format_bytes(estimate['bytes'])} to write, "
+            f"{format_bytes(free)} free in {directory}")
+
+
+def compare(estimate, summary):
+    """Predicted vs actual line for a finished run's telemetry summary."""
+    wall = summary["wall_s"]
+    out = f"Took {format_duration(wall)} (estimated {format_duration(estimate['wall_s'])}"
+    if estimate["wall_s"]:
+        out += f", {(wall / estimate['wall_s'] - 1) * 100:+.0f}%"
+    out += f"), wrote {format_bytes(summary['bytes'])} (estimated {format_bytes(estimate['bytes'])}"
+    if estimate["bytes"]:
+        out += f", {(summary['bytes'] / estimate['bytes'] - 1) * 100:+.0f}%"
+    return out + ")"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ProClip Studio render cost estimate")
+    add_job_arguments(parser)
+    add_render_arguments(parser)
+    parser.add_argument("--render", action="store_true", help="Render afterwards and compare with the estimate")
+    parser.add_argument("--clips", action="store_true", help="List the per-clip estimates")
+    args = parser.parse_args(argv)
+    try:
+        job = job_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    options = render_options(args)
+    estimate = estimate_render(job, status=print, **options)
+    if args.clips:
+        for c in estimate["clips"]:
+            print(f"  clip {c['clip']}: {c['start']:.1f}-{c['end']:.1f}s, ~{c['wall_s']:.1f}s, ~{format_bytes(c['bytes'])}")
+    print(describe(estimate))
+    warning = space_warning(estimate, job.output_dir)
+    if warning:
+        print(warning)
+    if not args.render: return 0
+
+    os.makedirs(job.output_dir, exist_ok=True)
+    channel = ProgressChannel()
+    render(job, status=print, estimate=estimate, progress=channel, **options)
+    for kind, data in channel.drain():
+        if kind == "summary":
+            print(compare(estimate, data))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,363 @@
+import os
+import re
+import shutil
+import tempfile
+import subprocess
+
+# Same binary MoviePy uses (bundled by imageio-ffmpeg unless FFMPEG_BINARY is set)
+from moviepy.config import FFMPEG_BINARY
+
+# Hide console windows for ffmpeg children in the --noconsole Windows build
+_NO_WINDOW = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+
+# Stream copy output must stay playable everywhere (same rule as the yuv420p/aac re-encode)
+COPY_VIDEO_CODECS = ["h264"]
+COPY_PIX_FMTS = ["yuv420p", "yuvj420p"]
+COPY_AUDIO_CODECS = ["aac", "mp3"]
+STOP_POLL = 0.05 # seconds between abort checks while an ffmpeg child runs
+PROGRESS_PERIOD = 0.1 # seconds between -progress reports (also the abort check interval then)
+
+
+class Cancelled(Exception):
+    """The render was aborted (stop event set) while work was in progress."""
+
+
+def _failure(args, returncode, log):
+    """RuntimeError for a failed ffmpeg run: its exit status plus `log` (the tail of its
+    stderr), or the command line when it printed nothing (a crash such as a segfault)."""
+    status = f"killed by signal {-returncode}" if returncode < 0 else f"exit code {returncode}"
+    if log:
+        return RuntimeError(f"ffmpeg failed ({status}): {log}")
+    return RuntimeError(f"ffmpeg failed ({status}) without output: {subprocess.list2cmdline([FFMPEG_BINARY] + args)}")
+
+
+def run_ffmpeg(args, stop_event=None, on_frames=None):
+    """Run ffmpeg with `args`, raising RuntimeError with the tail of its log on failure.
+
+    With a `stop_event` the child is killed as soon as it is set and
+    Cancelled is raised (the output file is left for the caller to remove).
+    `on_frames(n)` hears about newly encoded frames while it runs.
+    """
+    if on_frames is not None:
+        returncode, err = _run_with_progress(args, stop_event, on_frames)
+    else:
+        proc = subprocess.Popen([FFMPEG_BINARY, "-hide_banner", "-nostdin"] + args,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, creationflags=_NO_WINDOW)
+        while True:
+            try:
+                _, err = proc.communicate(timeout=STOP_POLL if stop_event is not None else None)
+                break
+            except subprocess.TimeoutExpired:
+                if stop_event.is_set():
+                    proc.kill()
+                    proc.communicate()
+                    raise Cancelled()
+        returncode = proc.returncode
+    if returncode != 0:
+        log = err.decode("utf-8", "replace").strip().splitlines()
+        raise _failure(args, returncode, "\n".join(log[-5:]))
+
+
+def _run_with_progress(args, stop_event, on_frames):
+    # -progress writes key=value blocks to stdout every stats period; the log
+    # goes to a temp file so a full stderr pipe can never stall the encoder.
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen([FFMPEG_BINARY, "-hide_banner", "-nostdin", "-nostats",
+                                 "-progress", "pipe:1", "-stats_period", str(PROGRESS_PERIOD)] + args,
+                                stdout=subprocess.PIPE, stderr=log, creationflags=_NO_WINDOW)
+        seen = 0
+        for line in proc.stdout:
+            if stop_event is not None and stop_event.is_set():
+                proc.kill()
+                proc.wait()
+                proc.stdout.close()
+                raise Cancelled()
+            if line.startswith(b"frame="):
+                frame = int(line[6:].strip() or 0)
+                if frame > seen:
+                    on_frames(frame - seen)
+                    seen = frame
+        proc.stdout.close()
+        proc.wait()
+        log.seek(0)
+        return proc.returncode, log.read()
+
+
+def pipe_ffmpeg(args):
+    """Run ffmpeg writing to stdout ("-" as output) and return what it wrote."""
+    proc = subprocess.run([FFMPEG_BINARY, "-hide_banner", "-nostdin", "-loglevel", "error"] + args,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, creationflags=_NO_WINDOW)
+    log = proc.stderr.decode("utf-8", "replace").strip()[-300:]
+    if proc.returncode != 0:
+        raise _failure(args, proc.returncode, log)
+    if not proc.stdout:
+        # Exited cleanly but wrote nothing (e.g. a seek past the end): not a crash
+        raise RuntimeError(f"ffmpeg wrote no output: {log or subprocess.list2cmdline([FFMPEG_BINARY] + args)}")
+    return proc.stdout
+
+
+def stream_ffmpeg(args, block_size, stop_event=None):
+    """Run ffmpeg writing to stdout ("-" as output) and yield what it writes in blocks of
+    `block_size` bytes (the last one may be shorter). Setting `stop_event` kills it and raises Cancelled."""
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen([FFMPEG_BINARY, "-hide_banner", "-nostdin", "-loglevel", "error"] + args,
+                                stdout=subprocess.PIPE, stderr=log, creationflags=_NO_WINDOW)
+        finished = False
+        try:
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    raise Cancelled()
+                block = proc.stdout.read(block_size)
+                if not block: break
+                yield block
+            finished = True
+        finally:
+            if not finished:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+        if proc.returncode != 0:
+            log.seek(0)
+            raise _failure(args, proc.returncode, log.read().decode("utf-8", "replace").strip()[-300:])
+
+
+def _ffmpeg_log(args, stop_event=None):
+    # ffmpeg -i without an output exits non-zero but still prints everything we need
+    proc = subprocess.Popen([FFMPEG_BINARY, "-hide_banner", "-nostdin"] + args,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, creationflags=_NO_WINDOW)
+    while True:
+        try:
+            _, err = proc.communicate(timeout=STOP_POLL if stop_event is not None else None)
+            return err.decode("utf-8", "replace")
+        except subprocess.TimeoutExpired:
+            if stop_event.is_set():
+                proc.kill()
+                proc.communicate()
+                raise Cancelled()
+
+
+def probe(path):
+    """Container/stream facts parsed from `ffmpeg -i` (ffprobe isn't bundled with imageio-ffmpeg)."""
+    log = _ffmpeg_log(["-i", path])
+    info = {"duration": None, "start": 0.0, "video_codec": None, "profile": None, "pix_fmt": None,
+            "size": None, "fps": None, "audio_codec": None}
+
+    m = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", log)
+    if m:
+        info["duration"] = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+    m = re.search(r"start: (-?\d+(?:\.\d+)?)", log)
+    if m:
+        info["start"] = float(m.group(1))
+
+    for line in log.splitlines():
+        line = line.strip()
+        if not line.startswith("Stream #"): continue
+        if ": Video: " in line and info["video_codec"] is None and "attached pic" not in line:
+            m = re.search(r"Video: (\w+)(?: \(([^)]*)\))?[^,]*, (\w+)", line)
+            if m:
+                info["video_codec"], info["profile"], info["pix_fmt"] = m.group(1), m.group(2), m.group(3)
+            m = re.search(r", (\d{2,5})x(\d{2,5})", line)
+            if m:
+                info["size"] = (int(m.group(1)), int(m.group(2)))
+            m = re.search(r"(\d+(?:\.\d+)?) fps", line)
+            if m:
+                info["fps"] = float(m.group(1))
+        elif ": Audio: " in line and info["audio_codec"] is None:
+            m = re.search(r"Audio: (\w+)", line)
+            if m:
+                info["audio_codec"] = m.group(1)
+    return info
+
+
+def keyframe_times(path, start_offset=0.0):
+    """Sorted keyframe timestamps (seconds from the start of the file) of the first video stream."""
+    # -skip_frame nokey makes the decoder hand over keyframes only, so this is cheap.
+    log = _ffmpeg_log(["-skip_frame", "nokey", "-i", path, "-map", "0:v:0", "-an",
+                       "-vf", "showinfo", "-f", "null", "-"])
+    times = [float(t) - start_offset for t in re.findall(r"Parsed_showinfo.*?pts_time:\s*(-?\d+(?:\.\d+)?)", log)]
+    return sorted(set(round(t, 6) for t in times if t >= -1e-6))
+
+
+def can_stream_copy(info):
+    """True when segments of this source can be copied into an mp4 without re-encoding."""
+    if info["video_codec"] not in COPY_VIDEO_CODECS or info["pix_fmt"] not in COPY_PIX_FMTS:
+        return False
+    return info["audio_codec"] is None or info["audio_codec"] in COPY_AUDIO_CODECS
+
+
+def copy_cut(src, start, end, out_file):
+    """Lossless cut snapped back to the keyframe at or before `start` (no decoding at all)."""
+    run_ffmpeg(["-y", "-ss", f"{start:.6f}", "-i", src, "-t", f"{end - start:.6f}",
+                "-map", "0:v:0", "-map", "0:a:0?", "-c", "copy",
+                "-avoid_negative_ts", "make_zero", "-movflags", "+faststart", out_file])
+    return out_file
+
+
+def _edge_video_args(info):
+    # Near-lossless H.264 matched to the source stream (profile, frame rate)
+    args = ["-c:v", "libx264", "-preset", "fast", "-crf", "16", "-pix_fmt", "yuv420p"]
+    if info["profile"] and info["profile"].lower() in ["baseline", "main", "high"]:
+        args += ["-profile:v", info["profile"].lower()]
+    if info["fps"]:
+        args += ["-r", f"{info['fps']:g}"]
+    return args
+
+
+def _encode_edge(src, start, end, info, out_ts):
+    # Frame accurate re-encode of a partial GOP, matched to the source stream so it can be concatenated
+    run_ffmpeg(["-y", "-ss", f"{start:.6f}", "-i", src, "-t", f"{end - start:.6f}", "-map", "0:v:0", "-an"]
+               + _edge_video_args(info) + ["-f", "mpegts", out_ts])
+
+
+def reencode_cut(src, start, end, out_file, info):
+    """Frame accurate cut with the whole range re-encoded (smart_cut's fallback)."""
+    run_ffmpeg(["-y", "-ss", f"{start:.6f}", "-i", src, "-t", f"{end - start:.6f}", "-map", "0:v:0", "-map", "0:a:0?"]
+               + _edge_video_args(info) + ["-c:a", "aac", "-b:a", "192k", "-movflags", "+faststart", out_file])
+    return out_file
+
+
+def smart_cut(src, start, end, out_file, keyframes, info):
+    """Frame accurate cut: re-encode only the partial GOPs at each edge and copy the middle.
+
+    If joining the parts fails (some ffmpeg builds choke on the MPEG-TS
+    intermediates), the clip is re-encoded whole instead.
+    """
+    # Half a frame of slack so a cut sitting on a keyframe counts as on it
+    eps = 0.5 / (info["fps"] or 30)
+    inner = [k for k in keyframes if start - eps <= k <= end + eps]
+    k_in = inner[0] if inner else None
+    k_out = inner[-1] if inner else None
+
+    if k_in is None or k_out <= k_in:
+        # No whole GOP inside the range: nothing worth copying
+        k_in = k_out = None
+
+    tmp_dir = tempfile.mkdtemp(prefix="proclip-cut-")
+    try:
+        parts = []
+        if k_in is None:
+            _encode_edge(src, start, end, info, os.path.join(tmp_dir, "all.ts"))
+            parts.append(os.path.join(tmp_dir, "all.ts"))
+        else:
+            if k_in - start > eps:
+                _encode_edge(src, start, k_in, info, os.path.join(tmp_dir, "head.ts"))
+                parts.append(os.path.join(tmp_dir, "head.ts"))
+
+            # Seeking a hair past the keyframe still lands on it (seek goes to the keyframe <= t)
+            mid = os.path.join(tmp_dir, "mid.ts")
+            run_ffmpeg(["-y", "-ss", f"{k_in + 0.001:.6f}", "-i", src, "-t", f"{k_out - k_in:.6f}",
+                        "-map", "0:v:0", "-an", "-c:v", "copy", "-bsf:v", "h264_mp4toannexb",
+                        "-f", "mpegts", mid])
+            parts.append(mid)
+
+            if end - k_out > eps:
+                _encode_edge(src, k_out, end, info, os.path.join(tmp_dir, "tail.ts"))
+                parts.append(os.path.join(tmp_dir, "tail.ts"))
+
+        args = ["-y", "-i", "concat:" + "|".join(parts), "-map", "0:v:0"]
+        if info["audio_codec"]:
+            # Audio packets are tiny, so copy them on their own: coarse seek before the
+            # cut, then drop packets up to the exact start on the output side.
+            preroll = min(start, 5.0)
+            audio = os.path.join(tmp_dir, "audio.mka")
+            run_ffmpeg(["-y", "-ss", f"{start - preroll:.6f}", "-i", src, "-ss", f"{preroll:.6f}",
+                        "-t", f"{end - start:.6f}", "-map", "0:a:0", "-vn", "-c:a", "copy", audio])
+            args = ["-y", "-i", "concat:" + "|".join(parts), "-i", audio, "-map", "0:v:0", "-map", "1:a:0"]
+        run_ffmpeg(args + ["-c", "copy", "-movflags", "+faststart", out_file])
+    except RuntimeError:
+        return reencode_cut(src, start, end, out_file, info)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return out_file
+
+
+# --- Filtergraph Backend ---
+def geometry_filter(geo, fps=None):
+    """Native crop/pad/scale/fps chain equivalent to the MoviePy composite path for `geo`."""
+    steps = []
+    if geo["canvas"]:
+        bg_w, bg_h = geo["canvas"]
+        off_x, off_y = geo["offset"]
+        x0, y0, x1, y1 = geo["window"]
+        # Full chroma while cropping/padding so odd offsets stay pixel exact
+        steps.append("format=yuv444p")
+        if x1 > x0 and y1 > y0:
+            steps.append(f"crop={x1 - x0}:{y1 - y0}:{x0}:{y0}:exact=1")
+            steps.append(f"pad={bg_w}:{bg_h}:{x0 + off_x}:{y0 + off_y}:black")
+        else:
+            # Crop box entirely off the frame: all black
+            steps.append(f"scale={bg_w}:{bg_h},drawbox=x=0:y=0:w=iw:h=ih:color=black:t=fill")
+    if geo["scaled"]:
+        rw, rh = geo["scaled"]
+        steps.append(f"scale={rw}:{rh}:flags=lanczos")
+        if geo["size"] != geo["scaled"]:
+            steps.append(f"crop={geo['size'][0]}:{geo['size'][1]}:0:0")
+    if fps:
+        steps.append(f"fps={fps:g}")
+    steps.append("setsar=1")
+    return ",".join(steps)
+
+
+def encode_clip(src, start, duration, out_file, video_filter, video_args,
+                audio_mode="original", bg_path="", source_audio=True, loop_source=False,
+                bg_gain_db=0.0, original_gain_db=0.0, duck_db=0.0, gain_db=0.0, stop_event=None, on_frames=None):
+    """Cut, filter and encode one clip in a single ffmpeg process (frames never reach Python).
+
+    `video_args` are the encoder options (codec, preset, rate control, threads).
+    `gain_db` is applied to the final audio (loudness normalization).
+    Setting `stop_event` kills the encoder and raises Cancelled; `on_frames`
+    is described on run_ffmpeg.
+    """
+    args = ["-y"]
+    if loop_source:
+        # Wraps back to the file start, like concatenating the source with itself
+        args += ["-stream_loop", "-1"]
+    args += ["-ss", f"{start:.6f}", "-i", src]
+
+    use_bg = audio_mode in ["mix", "background"] and bool(bg_path)
+    if use_bg:
+        args += ["-stream_loop", "-1", "-i", bg_path]
+
+    graph = [f"[0:v:0]{video_filter}[v]"]
+    audio_map = None
+    out_gain = f",volume={gain_db}dB" if gain_db else ""
+    if use_bg and audio_mode == "mix" and source_audio:
+        graph.append(f"[1:a:0]volume={bg_gain_db}dB[bg]")
+        graph.append(f"[0:a:0]volume={original_gain_db}dB,asplit[orig][key]")
+        if duck_db:
+            # The source keys a compressor on the background (same idea as audio_tools.duck_envelope)
+            ratio = max(1.0, min(20.0, 10 ** (abs(duck_db) / 20)))
+            graph.append(f"[bg][key]sidechaincompress=threshold=0.02:ratio={ratio:.2f}:attack=20:release=250[bgd]")
+        else:
+            graph.append("[key]anullsink")
+        # Plain sum, same as the array mixer
+        graph.append(f"[orig][{'bgd' if duck_db else 'bg'}]amix=inputs=2:duration=first:normalize=0{out_gain}[a]")
+        audio_map = "[a]"
+    elif use_bg:
+        graph.append(f"[1:a:0]volume={bg_gain_db}dB{out_gain}[a]")
+        audio_map = "[a]"
+    elif source_audio and gain_db:
+        graph.append(f"[0:a:0]volume={gain_db}dB[a]")
+        audio_map = "[a]"
+    elif source_audio:
+        audio_map = "0:a:0"
+
+    args += ["-filter_complex", ";".join(graph), "-map", "[v]"]
+    if audio_map:
+        args += ["-map", audio_map, "-c:a", "aac", "-b:a", "192k"]
+    args += ["-t", f"{duration:.6f}"] + video_args + ["-pix_fmt", "yuv420p", "-movflags", "+faststart", out_file]
+    run_ffmpeg(args, stop_event, on_frames)
+    return out_file
+
+
+def compare_quality(distorted, reference, stop_event=None):
+    """-> (ssim, psnr) of `distorted` against `reference` over all frames (both the same size).
+    Setting `stop_event` kills the comparison and raises Cancelled."""
+    log = _ffmpeg_log(["-i", distorted, "-i", reference, "-filter_complex",
+                       "[0:v]split[d0][d1];[1:v]split[r0][r1];[d0][r0]ssim;[d1][r1]psnr",
+                       "-f", "null", "-"], stop_event)
+    ssim = re.search(r"SSIM .*All:(\d+(?:\.\d+)?)", log)
+    psnr = re.search(r"PSNR .*average:(\d+(?:\.\d+)?|inf)", log)
+    if not ssim or not psnr:
+        raise RuntimeError("ffmpeg failed: could not measure quality")
+    return float(ssim.group(1)), float(psnr.group(1))
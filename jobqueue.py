@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from dataclasses import asdict
+
+from engine import RenderJob, add_job_arguments, add_render_arguments, job_from_args, job_ranges, render, render_options
+from media_cache import cached_probe
+
+CLIP_STATES = ["pending", "rendering", "done", "failed"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_path TEXT NOT NULL,
+    job TEXT NOT NULL,                  -- RenderJob as JSON (crop geometry + export settings)
+    options TEXT NOT NULL DEFAULT '{}', -- render() options (backend, workers, ...)
+    added REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clips (
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    out_file TEXT,                      -- content addressed name, known once the clip renders
+    state TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    updated REAL,
+    PRIMARY KEY (source_id, idx)
+);
+"""
+
+
+def default_queue_path():
+    """Queue database shared by the GUI and the headless runner (override with PROCLIP_QUEUE)."""
+    path = os.environ.get("PROCLIP_QUEUE") or os.path.join(os.path.expanduser("~"), ".proclipstudio", "queue.db")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return path
+
+
+def job_to_json(job):
+    data = asdict(job)
+    # Absolute, so `run` finds the files from any working directory
+    for key in ("video_path", "output_dir", "audio_path"):
+        if data[key]:
+            data[key] = os.path.abspath(data[key])
+    return json.dumps(data)
+
+
+def job_from_json(text):
+    data = json.loads(text)
+    if data.get("crop") is not None:
+        data["crop"] = tuple(data["crop"])
+    # Tolerate rows written by older/newer versions
+    fields = RenderJob.__dataclass_fields__
+    return RenderJob(**{k: v for k, v in data.items() if k in fields})
+
+
+class JobQueue:
+    """SQLite backed batch of sources, each split into clips with a persisted state.
+
+    Clip plans are fixed when a source is added and output names are content
+    addressed, so an interrupted run resumes with exactly the clips that were
+    not done.
+    """
+    def __init__(self, path=None):
+        self.path = path or default_queue_path()
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add(self, job, status=None, stop_event=None, **options):
+        """Queue `job`; returns its source id.
+
+        Planning may run the scene cut / loudness analyses, so callers with
+        a UI should call this off their event thread (`status` and
+        `stop_event` are passed through to the analysis).
+        """
+        info = cached_probe(job.video_path)
+        ranges = job_ranges(job, info["duration"], status, stop_event)[0]
+        # Pin the count so the plan can't shift if a backend measures the duration slightly differently
+        job = RenderJob(**{**asdict(job), "count": len(ranges)})
+
+        with self.lock, self.db:
+            cur = self.db.execute("INSERT INTO sources (video_path, job, options, added) VALUES (?, ?, ?, ?)",
+                                  (os.path.abspath(job.video_path), job_to_json(job), json.dumps(options), time.time()))
+            source_id = cur.lastrowid
+            self.db.executemany(
+                "INSERT INTO clips (source_id, idx, start, end, state, updated) VALUES (?, ?, ?, ?, 'pending', ?)",
+                [(source_id, i, start, end, time.time()) for i, (start, end) in enumerate(ranges)])
+        return source_id
+
+    def set_state(self, source_id, idx, state, error=None, out_file=None):
+        with self.lock, self.db:
+            self.db.execute("UPDATE clips SET state = ?, error = ?, out_file = COALESCE(?, out_file), updated = ? "
+                            "WHERE source_id = ? AND idx = ?", (state, error, out_file, time.time(), source_id, idx))
+
+    def recover(self):
+        """Clips left "rendering" by a crash or Abort go back to pending."""
+        with self.lock, self.db:
+            return self.db.execute("UPDATE clips SET state = 'pending', updated = ? WHERE state = 'rendering'",
+                                   (time.time(),)).rowcount
+
+    def retry_failed(self):
+        with self.lock, self.db:
+            return self.db.execute("UPDATE clips SET state = 'pending', error = NULL, updated = ? WHERE state = 'failed'",
+                                   (time.time(),)).rowcount
+
+    def pending_sources(self):
+        """-> [(source_id, job, options)] with at least one pending clip, oldest first."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, job, options FROM sources WHERE EXISTS "
+                "(SELECT 1 FROM clips WHERE source_id = sources.id AND state = 'pending') ORDER BY id").fetchall()
+        return [(row[0], job_from_json(row[1]), json.loads(row[2])) for row in rows]
+
+    def clips(self, source_id):
+        """-> {idx: (out_file, state)}"""
+        with self.lock:
+            rows = self.db.execute("SELECT idx, out_file, state FROM clips WHERE source_id = ?", (source_id,)).fetchall()
+        return {idx: (out_file, state) for idx, out_file, state in rows}
+
+    def summary(self):
+        """-> [(source_id, video_path, {state: count})]"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT s.id, s.video_path, c.state, COUNT(*) FROM sources s JOIN clips c ON c.source_id = s.id "
+                "GROUP BY s.id, c.state ORDER BY s.id").fetchall()
+        out = {}
+        for source_id, video_path, state, count in rows:
+            out.setdefault(source_id, (source_id, video_path, {}))[2][state] = count
+        return list(out.values())
+
+    def drain(self, status=None, stop_event=None, **overrides):
+        """Render every pending clip of every source. Returns the number of clips finished."""
+        status = status or (lambda msg: None)
+        stop_event = stop_event or threading.Event()
+        self.recover()
+        finished = 0
+
+        for source_id, job, options in self.pending_sources():
+            if stop_event.is_set(): break
+            clips = self.clips(source_id)
+            only = {idx for idx, (_, state) in clips.items() if state == "pending"}
+            status(f"[{source_id}] {os.path.basename(job.video_path)}: {len(only)} clip(s) to render")
+
+            rendering = set()
+            failed = set()
+
+            def on_clip(idx, state, out_file, source_id=source_id, rendering=rendering, failed=failed):
+                rendering.discard(idx)
+                if state == "rendering": rendering.add(idx)
+                if state == "failed": failed.add(idx)
+                self.set_state(source_id, idx, state, out_file=out_file)
+
+            try:
+                os.makedirs(job.output_dir, exist_ok=True)
+                written = render(job, status=status, stop_event=stop_event, only=only,
+                                 on_clip=on_clip, **{**options, **overrides})
+                finished += len(written)
+            except Exception as e:
+                # This source failed; keep going with the rest of the batch
+                if not failed:
+                    # Source level (missing file, probe, audio): no clip got to fail on its own
+                    failed = {idx for idx, (_, state) in self.clips(source_id).items() if state == "pending"}
+                for idx in failed:
+                    self.set_state(source_id, idx, "failed", str(e))
+                status(f"[{source_id}] failed: {e}")
+            # Clips still marked rendering were cut short (Abort, or a sibling clip failing)
+            for idx in rendering:
+                self.set_state(source_id, idx, "pending")
+        return finished
+
+
+# --- Command Line ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ProClip Studio batch queue")
+    parser.add_argument("--queue", default=None, help="Queue database (default: ~/.proclipstudio/queue.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_add = sub.add_parser("add", help="Queue a source with its crop and export settings")
+    add_job_arguments(p_add)
+    add_render_arguments(p_add)
+
+    sub.add_parser("run", help="Render every pending clip (resumes interrupted batches)")
+    sub.add_parser("status", help="Show per-source clip states")
+    sub.add_parser("retry", help="Mark failed clips pending again")
+
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.queue)
+    try:
+        if args.command == "add":
+            try:
+                job = job_from_args(args)
+            except ValueError as e:
+                parser.error(str(e))
+            source_id = queue.add(job, status=print, **render_options(args))
+            print(f"Queued source {source_id}: {job.video_path}")
+        elif args.command == "run":
+            stop_event = threading.Event()
+            try:
+                count = queue.drain(status=print, stop_event=stop_event)
+            except KeyboardInterrupt:
+                stop_event.set()
+                queue.recover()
+                print("Stopped. Run again to resume.")
+                return 130
+            print(f"Rendered {count} clips.")
+        elif args.command == "retry":
+            print(f"{queue.retry_failed()} clip(s) pending again.")
+        else:
+            for source_id, video_path, counts in queue.summary():
+                states = ", ".join(f"{state}: {counts[state]}" for state in CLIP_STATES if state in counts)
+                print(f"[{source_id}] {video_path} - {states}")
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
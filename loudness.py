@@ -0,0 +1,163 @@
+import os
+import json
+
+import numpy as np
+
+import ffmpeg_tools
+from media_cache import analysis_source, atomic_write_json, cache_dir, source_key
+
+ENVELOPE_HOP = 0.1 # seconds per envelope block (short-term loudness resolution)
+ANALYSIS_RATE = 22050 # mono sample rate the envelope is measured at
+HIGHPASS_HZ = 60 # rumble below this doesn't count towards loudness (a rough K-weighting)
+CHUNK_BLOCKS = 600 # envelope blocks read from ffmpeg at a time
+ABSOLUTE_GATE_DB = -70.0 # blocks quieter than this never count (BS.1770 style gating)...
+RELATIVE_GATE_DB = -10.0 # ...nor blocks this far below the ungated level of the window
+SILENCE_DB = -45.0 # blocks above this count as "active" for energy ranking
+ACTIVITY_WEIGHT = 10.0 # score (dB) a fully active window earns over an equally loud, mostly silent one
+TARGET_DB = -16.0 # default output loudness: gated RMS in dBFS, close to LUFS for speech and music
+MAX_GAIN_DB = 20.0 # normalization never boosts or cuts more than this
+PEAK_CEILING_DB = -1.0 # ...nor boosts block peaks past this
+LOUDNESS_VERSION = 1 # bump when the measurement changes, so cached envelopes are redone
+
+
+def _db(power):
+    return 10 * np.log10(np.maximum(power, 1e-12))
+
+
+class Envelope:
+    """Mean square power and peak per ENVELOPE_HOP block of one file's audio (mono, high-passed)."""
+    def __init__(self, power, peak, hop=ENVELOPE_HOP):
+        self.power = np.asarray(power, dtype=np.float64)
+        self.peak = np.asarray(peak, dtype=np.float64)
+        self.hop = hop
+
+    @property
+    def duration(self):
+        return len(self.power) * self.hop
+
+    def _window(self, start, end, wrap=False):
+        """Block indices of [start, end); with `wrap` the audio repeats (looped sources, background tracks)."""
+        first, last = int(start / self.hop), max(int(start / self.hop) + 1, int(np.ceil(end / self.hop)))
+        idx = np.arange(first, last)
+        return idx % len(self.power) if wrap else idx[idx < len(self.power)]
+
+    def loudness(self, start, end, wrap=False):
+        """Gated loudness of [start, end) in dB, None when it is silent."""
+        power = self.power[self._window(start, end, wrap)]
+        power = power[_db(power) > ABSOLUTE_GATE_DB]
+        if not len(power): return None
+        power = power[_db(power) > _db(power.mean()) + RELATIVE_GATE_DB]
+        return float(_db(power.mean()))
+
+    def peak_db(self, start, end, wrap=False):
+        peak = self.peak[self._window(start, end, wrap)]
+        return float(20 * np.log10(max(peak.max(), 1e-6))) if len(peak) else None
+
+
+def _cache_entry(path):
+    return os.path.join(cache_dir("loudness"), f"{source_key(path)}-v{LOUDNESS_VERSION}.json")
+
+
+_loaded = {} # cache entry -> Envelope, so a batch of clips reads each file once
+
+
+def audio_envelope(path, status=None, stop_event=None):
+    """Envelope of the first audio stream of `path` (its proxy when there is one), None without audio.
+
+    Decoded once to mono float PCM in blocks; power and peak per block
+    are plain numpy reductions. Cached per file.
+    """
+    entry = _cache_entry(path)
+    if entry in _loaded:
+        return _loaded[entry]
+    if os.path.exists(entry):
+        try:
+            with open(entry) as f:
+                data = json.load(f)
+            env = None if data["power_db"] is None else Envelope(10 ** (np.asarray(data["power_db"]) / 10),
+                                                                 data["peak"], data["hop"])
+            _loaded[entry] = env
+            return env
+        except (OSError, ValueError, KeyError): pass
+
+    env = None
+    if ffmpeg_tools.probe(path)["audio_codec"] is not None:
+        if status:
+            status("Measuring loudness...")
+        hop = int(ANALYSIS_RATE * ENVELOPE_HOP)
+        args = ["-i", analysis_source(path), "-map", "0:a:0", "-vn", "-af", f"highpass=f={HIGHPASS_HZ}",
+                "-ac", "1", "-ar", str(ANALYSIS_RATE), "-f", "f32le", "-"]
+        power, peak = [], []
+        for block in ffmpeg_tools.stream_ffmpeg(args, hop * 4 * CHUNK_BLOCKS, stop_event):
+            samples = np.frombuffer(block, dtype=np.float32, count=len(block) // 4)
+            full = len(samples) // hop * hop
+            blocks = [samples[:full].reshape(-1, hop)]
+            if full < len(samples): # the file's last, shorter block
+                blocks.append(samples[full:][None])
+            for b in blocks:
+                power.append(np.mean(np.square(b, dtype=np.float64), axis=1))
+                peak.append(np.abs(b).max(axis=1))
+        if power:
+            env = Envelope(np.concatenate(power), np.concatenate(peak))
+
+    data = {"hop": ENVELOPE_HOP, "power_db": None, "peak": None}
+    if env is not None:
+        data.update(power_db=np.round(_db(env.power), 2).tolist(), peak=np.round(env.peak, 4).tolist())
+    atomic_write_json(entry, data)
+    _loaded[entry] = env
+    return env
+
+
+def loudest_windows(env, window, count):
+    """Starts of the `count` best non-overlapping `window` second stretches of `env`, in time order.
+
+    A stretch scores its mean level plus ACTIVITY_WEIGHT times the share
+    of its blocks above SILENCE_DB, so one bang in a quiet minute loses to
+    a minute of steady action. Every start position is scored at once from
+    cumulative sums; the greedy pick then blanks out overlapping starts.
+    """
+    n = max(1, int(round(window / env.hop)))
+    if len(env.power) <= n:
+        return [0.0]
+    csum = np.concatenate([[0.0], np.cumsum(env.power)])
+    active = np.concatenate([[0], np.cumsum(_db(env.power) > SILENCE_DB)])
+    score = _db((csum[n:] - csum[:-n]) / n) + ACTIVITY_WEIGHT * (active[n:] - active[:-n]) / n
+
+    picks = []
+    for _ in range(count):
+        k = int(np.argmax(score))
+        if not np.isfinite(score[k]): break
+        picks.append(k)
+        score[max(0, k - n + 1):k + n] = -np.inf
+    return sorted(round(k * env.hop, 3) for k in picks)
+
+
+def output_gain_db(job, start, end, target_db=None):
+    """Gain in dB that brings the clip's final audio to `target_db` (default job.normalize_db).
+
+    Worked out from the cached envelopes of the source and the background
+    track, with the job's own gains applied and the two summed as
+    uncorrelated signals, so encoding needs no second measuring pass.
+    Capped at +-MAX_GAIN_DB and by PEAK_CEILING_DB; 0 when nothing is audible.
+    """
+    target_db = job.normalize_db if target_db is None else target_db
+    uses_track = job.audio_mode in ("mix", "background") and bool(job.audio_path)
+    parts = [] # (loudness, peak) in dB of each audible input, after its gain
+    if not (uses_track and job.audio_mode == "background"):
+        env = audio_envelope(job.video_path)
+        level = env.loudness(start, end, wrap=True) if env else None
+        if level is not None:
+            gain = job.original_gain_db if uses_track else 0.0
+            parts.append((level + gain, env.peak_db(start, end, wrap=True) + gain))
+    if uses_track:
+        env = audio_envelope(job.audio_path)
+        # The track always starts from its beginning in each clip
+        level = env.loudness(0.0, end - start, wrap=True) if env else None
+        if level is not None:
+            parts.append((level + job.bg_gain_db, env.peak_db(0.0, end - start, wrap=True) + job.bg_gain_db))
+    if not parts: return 0.0
+
+    level = 10 * np.log10(sum(10 ** (l / 10) for l, _ in parts))
+    peak = 20 * np.log10(sum(10 ** (p / 20) for _, p in parts))
+    gain = min(max(target_db - level, -MAX_GAIN_DB), MAX_GAIN_DB, PEAK_CEILING_DB - peak)
+    return round(float(gain), 2)
@@ -0,0 +1,46 @@
+import os
+import json
+import time
+import threading
+
+from media_cache import atomic_write_json
+
+MANIFEST_NAME = "proclip-manifest.json"
+MANIFEST_VERSION = 1
+
+
+class RenderManifest:
+    """Clips already rendered into one output folder, keyed by their content identity.
+
+    Rewritten (atomically) after every finished clip, so a crash never leaves
+    an entry pointing at a half written file.
+    """
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.lock = threading.Lock()
+        self.clips = {}
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.clips = data.get("clips", {})
+        except (OSError, ValueError): pass
+
+    def lookup(self, clip_id):
+        """Path of the finished output for `clip_id`, or None if it's missing or changed on disk."""
+        entry = self.clips.get(clip_id)
+        if not entry: return None
+        path = os.path.join(self.output_dir, entry["file"])
+        try:
+            if os.path.getsize(path) == entry["bytes"]:
+                return path
+        except OSError: pass
+        return None
+
+    def record(self, clip_id, out_file, **details):
+        entry = {"file": os.path.basename(out_file), "bytes": os.path.getsize(out_file), "rendered": time.time(), **details}
+        with self.lock:
+            self.clips[clip_id] = entry
+            os.makedirs(self.output_dir, exist_ok=True)
+            atomic_write_json(self.path, {"version": MANIFEST_VERSION, "clips": self.clips}, indent=1)
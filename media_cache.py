@@ -0,0 +1,273 @@
+import io
+import os
+import sys
+import json
+import bisect
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+import ffmpeg_tools
+
+POSTER_MAX_T = 5.0 # poster frame at min(5s, duration / 2), same as the old load_frame
+THUMB_COUNT = 40 # thumbnails in the timeline strip
+THUMB_WIDTH = 160
+FRAME_CACHE_SIZE = 32 # full resolution scrub frames kept in memory
+FINGERPRINT_CHUNK = 1024 * 1024 # bytes hashed at the start, middle and end of a file
+PROXY_SIDE = 360 # short side of proxy media
+PROXY_GOP = 12 # frames between proxy keyframes (no B-frames), so any frame decodes almost at once
+PROXY_CRF = 26
+PROXY_AUTO_SIDE = 1440 # "auto" builds proxies for sources whose short side is at least this
+PROXY_MODES = ["auto", "always", "off"]
+
+
+def cache_dir(*parts):
+    """Per-user cache folder (override with PROCLIP_CACHE_DIR), created on demand."""
+    root = os.environ.get("PROCLIP_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".proclipstudio", "cache")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def atomic_output(entry, write):
+    """Produce `entry` by calling `write(tmp)` on a private temp file beside it, then renaming.
+
+    The GUI, the queue runner and pool workers fill the same caches and
+    folders, so readers never see a half written file and concurrent
+    writers never share a temp file. The temp name keeps the extension,
+    so ffmpeg still picks the right muxer.
+    """
+    stem, ext = os.path.splitext(os.path.basename(entry))
+    fd, tmp = tempfile.mkstemp(prefix=stem + ".", suffix=".tmp" + ext, dir=os.path.dirname(entry) or ".")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, entry)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+    return entry
+
+
+def atomic_write_json(entry, data, **kwargs):
+    """json.dump `data` to `entry` through atomic_output()."""
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(data, f, **kwargs)
+    atomic_output(entry, write)
+
+
+def source_key(path):
+    """Cache identity of a media file: absolute path + size + mtime."""
+    st = os.stat(path)
+    ident = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+
+def content_fingerprint(path):
+    """Identity of a file's contents: size plus hashes of its first, middle and last MiB.
+
+    Unlike source_key it survives copies and renames, and it never reads
+    more than a few MiB of a multi-GB source.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha1(str(size).encode("utf-8"))
+    with open(path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - FINGERPRINT_CHUNK // 2), max(0, size - FINGERPRINT_CHUNK)}):
+            f.seek(offset)
+            h.update(f.read(FINGERPRINT_CHUNK))
+    return h.hexdigest()
+
+
+def cached_probe(path):
+    """ffmpeg_tools.probe() result, reused until the file changes."""
+    entry = os.path.join(cache_dir("probe"), source_key(path) + ".json")
+    if os.path.exists(entry):
+        try:
+            with open(entry) as f:
+                info = json.load(f)
+            if info.get("size"): info["size"] = tuple(info["size"])
+            return info
+        except (OSError, ValueError): pass
+
+    info = ffmpeg_tools.probe(path)
+    if not info["duration"] or not info["size"]:
+        raise RuntimeError(f"No video stream found in {os.path.basename(path)}")
+    atomic_write_json(entry, info)
+    return info
+
+
+def grab_frame(path, t, out_file, width=None):
+    """Decode the single frame at `t` (input seek, so nothing before it is decoded)."""
+    args = ["-y", "-ss", f"{t:.3f}", "-i", path, "-map", "0:v:0", "-frames:v", "1"]
+    if width:
+        args += ["-vf", f"scale={width}:-2"]
+    ffmpeg_tools.run_ffmpeg(args + [out_file])
+    return out_file
+
+
+def poster_frame(path, info=None):
+    """Full resolution poster frame as a PIL image, cached on disk."""
+    info = info or cached_probe(path)
+    entry = os.path.join(cache_dir("poster"), source_key(path) + ".png")
+    if not os.path.exists(entry):
+        t = min(POSTER_MAX_T, info["duration"] / 2)
+        atomic_output(entry, lambda tmp: grab_frame(path, t, tmp))
+    with Image.open(entry) as img:
+        return img.convert("RGB")
+
+
+def read_frame(path, t, width=None):
+    """Decode the frame at `t` straight into memory (BMP over a pipe: no encode cost)."""
+    args = ["-ss", f"{t:.3f}", "-i", path, "-map", "0:v:0", "-frames:v", "1"]
+    if width:
+        args += ["-vf", f"scale={width}:-2"]
+    data = ffmpeg_tools.pipe_ffmpeg(args + ["-c:v", "bmp", "-f", "image2pipe", "-"])
+    with Image.open(io.BytesIO(data)) as img:
+        return img.convert("RGB")
+
+
+def proxy_path(path):
+    return os.path.join(cache_dir("proxy"), source_key(path) + ".mp4")
+
+
+def ready_proxy(path):
+    """Finished proxy of `path`, None if there is none (yet)."""
+    proxy = proxy_path(path)
+    return proxy if os.path.exists(proxy) else None
+
+
+def analysis_source(path):
+    """What previews and analysis passes decode for `path`: its proxy once built, else the file itself.
+
+    Proxies keep the source's timeline and frame rate, so times found on
+    one hold for the other. Geometry does not carry over; the editor works
+    in source pixels (the poster frame comes from the original).
+    """
+    return ready_proxy(path) or path
+
+
+def wants_proxy(info, mode="auto"):
+    if mode == "always": return True
+    return mode == "auto" and bool(info.get("size")) and min(info["size"]) >= PROXY_AUTO_SIDE
+
+
+def build_proxy(path, stop_event=None, on_frames=None):
+    """Transcode `path` to a PROXY_SIDE, short-GOP, fast-decode H.264 proxy (cached) -> proxy path.
+
+    `stop_event` aborts (ffmpeg_tools.Cancelled) without leaving a partial proxy behind.
+    """
+    proxy = ready_proxy(path)
+    if proxy: return proxy
+    info = cached_probe(path)
+    w, h = info["size"]
+    scale = f"scale=-2:{PROXY_SIDE}" if w >= h else f"scale={PROXY_SIDE}:-2"
+    return atomic_output(proxy_path(path), lambda tmp: ffmpeg_tools.run_ffmpeg([
+        "-y", "-i", path, "-map", "0:v:0", "-map", "0:a:0?", "-vf", scale,
+        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "fastdecode", "-crf", str(PROXY_CRF),
+        "-g", str(PROXY_GOP), "-bf", "0", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "96k", "-movflags", "+faststart", tmp], stop_event, on_frames))
+
+
+def keyframe_index(path, info=None):
+    """Keyframe timestamps of the source, scanned once and cached on disk."""
+    entry = os.path.join(cache_dir("keyframes"), source_key(path) + ".json")
+    if os.path.exists(entry):
+        try:
+            with open(entry) as f:
+                return json.load(f)
+        except (OSError, ValueError): pass
+
+    info = info or cached_probe(path)
+    keyframes = ffmpeg_tools.keyframe_times(path, info["start"])
+    atomic_write_json(entry, keyframes)
+    return keyframes
+
+
+def nearest_keyframe(keyframes, t):
+    """Keyframe closest to `t` (decoding there needs no frames before it). `t` if no index."""
+    if not keyframes: return t
+    i = bisect.bisect_right(keyframes, t)
+    return min(keyframes[max(0, i - 1):i + 1], key=lambda k: abs(k - t))
+
+
+def thumbnail(path, t, width=THUMB_WIDTH):
+    """Small frame at `t` for the timeline strip, cached on disk per source."""
+    entry = os.path.join(cache_dir("thumbs", source_key(path)), f"{int(round(t * 1000))}.jpg")
+    if not os.path.exists(entry):
+        atomic_output(entry, lambda tmp: grab_frame(analysis_source(path), t, tmp, width))
+    with Image.open(entry) as img:
+        return img.convert("RGB")
+
+
+def thumbnail_times(duration, count=THUMB_COUNT):
+    """Centres of `count` equal slices of the timeline."""
+    return [(i + 0.5) * duration / count for i in range(count)]
+
+
+def load_source(path):
+    """-> (probe info, poster image). Safe to call off the Tk thread."""
+    info = cached_probe(path)
+    return info, poster_frame(path, info)
+
+
+class SourceLoader:
+    """Background media work for the editor; the GUI polls the returned futures."""
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="proclip-load")
+        self.thumb_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="proclip-thumb")
+        # One proxy build at a time; a newer source cancels the one before
+        self.proxy_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="proclip-proxy")
+        self.proxy_stop = None
+        self.frames = OrderedDict() # (key, t) -> scrub frame (from the proxy once there is one)
+        self.frames_lock = threading.Lock()
+
+    def load(self, path):
+        return self.pool.submit(load_source, path)
+
+    def keyframes(self, path, info=None):
+        return self.pool.submit(keyframe_index, path, info)
+
+    def thumbnails(self, path, info, count=THUMB_COUNT):
+        """-> [(t, future)] for the timeline strip, generated on the thumbnail pool."""
+        return [(t, self.thumb_pool.submit(thumbnail, path, t)) for t in thumbnail_times(info["duration"], count)]
+
+    def proxy(self, path):
+        if self.proxy_stop is not None:
+            self.proxy_stop.set()
+        self.proxy_stop = stop = threading.Event()
+        return self.proxy_pool.submit(build_proxy, path, stop)
+
+    def close(self):
+        """Abort a running proxy build and drop queued work (for app exit)."""
+        if self.proxy_stop is not None:
+            self.proxy_stop.set()
+        for pool in (self.pool, self.thumb_pool, self.proxy_pool):
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def frame_at(self, path, t):
+        return self.pool.submit(self._frame_at, path, t)
+
+    def _frame_at(self, path, t):
+        key = (source_key(path), round(t, 3))
+        with self.frames_lock:
+            if key in self.frames:
+                self.frames.move_to_end(key)
+                return self.frames[key]
+        frame = read_frame(analysis_source(path), t)
+        with self.frames_lock:
+            self.frames[key] = frame
+            if len(self.frames) > FRAME_CACHE_SIZE:
+                self.frames.popitem(last=False)
+        return frame
+
+
+if __name__ == "__main__":
+    # python media_cache.py SOURCE... : build proxies ahead of time (e.g. on an ingest machine)
+    for src in sys.argv[1:]:
+        print(build_proxy(src))
@@ -0,0 +1,102 @@
+import os
+import time
+import queue
+import threading
+
+import numpy as np
+
+from ffmpeg_tools import Cancelled
+
+PIPELINE_DEPTH = 8 # frames in flight per clip (decoded + transformed + waiting for the encoder)
+PIPELINE_WORKERS = max(2, min(4, (os.cpu_count() or 2) // 2)) # transform threads
+
+
+def run_pipeline(frames, transform, write, out_shape, workers=PIPELINE_WORKERS, depth=PIPELINE_DEPTH,
+                 stop_event=None, on_frame=None):
+    """Decoder thread -> transform pool -> in-order writer, joined by bounded queues.
+
+    `frames` is iterated on the decoder thread, `transform(frame, out)`
+    fills a reusable uint8 buffer of `out_shape` on one of `workers`
+    threads and `write(buf)` runs on the calling thread in frame order.
+    The decoder takes a free buffer before reading each frame, so at most
+    `depth` frames exist at once and the frame the writer waits for always
+    has a buffer. Returns the busy seconds of each stage.
+    """
+    free = queue.Queue()
+    for _ in range(depth):
+        free.put(np.empty(out_shape, dtype=np.uint8))
+    work = queue.Queue()
+    done = queue.Queue()
+    abort = threading.Event()
+    busy = {"decode": 0.0, "transform": 0.0, "encode": 0.0}
+    busy_lock = threading.Lock()
+
+    def decoder():
+        n = 0
+        try:
+            it = iter(frames)
+            while True:
+                buf = free.get()
+                if buf is None or abort.is_set(): return
+                if stop_event is not None and stop_event.is_set():
+                    raise Cancelled()
+                started = time.perf_counter()
+                frame = next(it, None)
+                busy["decode"] += time.perf_counter() - started
+                if frame is None: break
+                work.put((n, frame, buf))
+                n += 1
+            done.put(("end", n))
+        except BaseException as e:
+            done.put(("error", e))
+        finally:
+            for _ in range(workers):
+                work.put(None)
+
+    def transformer():
+        while True:
+            item = work.get()
+            if item is None or abort.is_set(): return
+            n, frame, buf = item
+            started = time.perf_counter()
+            try:
+                transform(frame, buf)
+            except BaseException as e:
+                done.put(("error", e))
+                return
+            with busy_lock:
+                busy["transform"] += time.perf_counter() - started
+            done.put(("frame", n, buf))
+
+    threads = [threading.Thread(target=decoder, name="proclip-decode", daemon=True)]
+    threads += [threading.Thread(target=transformer, name=f"proclip-transform-{k}", daemon=True) for k in range(workers)]
+    for t in threads:
+        t.start()
+
+    ready = {} # transformed frames that arrived ahead of their turn
+    next_n = 0
+    total = None
+    try:
+        while total is None or next_n < total:
+            msg = done.get()
+            if msg[0] == "error":
+                raise msg[1]
+            if msg[0] == "end":
+                total = msg[1]
+                continue
+            ready[msg[1]] = msg[2]
+            while next_n in ready:
+                buf = ready.pop(next_n)
+                started = time.perf_counter()
+                write(buf)
+                busy["encode"] += time.perf_counter() - started
+                free.put(buf)
+                next_n += 1
+                if on_frame is not None:
+                    on_frame()
+    finally:
+        abort.set()
+        free.put(None) # wakes a decoder waiting for a buffer
+        for t in threads:
+            t.join()
+    return busy
@@ -0,0 +1,134 @@
+import json
+import time
+from collections import OrderedDict, deque
+
+from PIL import Image, ImageTk
+
+PYRAMID_MIN_SIDE = 256 # stop halving once the long side gets this small
+TILE_CACHE_SIZE = 24 # rendered viewport images kept for quick pan/zoom back and forth
+FRAME_BUDGET_MS = 16 # one display frame at 60 Hz
+
+
+class FramePyramid:
+    """Preview frame plus 1/2, 1/4, ... downsampled copies, built once per loaded frame.
+
+    `size` is the frame's size in source pixels when `image` is smaller
+    (a proxy frame); the renderer stretches it to that size.
+    """
+    def __init__(self, image, size=None):
+        self.source_size = tuple(size) if size else image.size
+        self.levels = [image]
+        while max(self.levels[-1].size) > PYRAMID_MIN_SIDE:
+            # reduce() is a box filter: cheap and alias free for exact halving
+            self.levels.append(self.levels[-1].reduce(2))
+
+    @property
+    def size(self):
+        return self.source_size
+
+    def level_for(self, scale):
+        """Smallest level that still has at least `scale` source pixels per screen pixel."""
+        k = 0
+        # A proxy frame starts out smaller than the source
+        scale *= self.source_size[0] / self.levels[0].size[0]
+        while k + 1 < len(self.levels) and scale <= 1 / (2 ** (k + 1)):
+            k += 1
+        return k
+
+
+class ViewportRenderer:
+    """Renders only the on-screen part of the frame, from the nearest pyramid level.
+
+    Results are kept in a small LRU keyed by scale and viewport, so stepping
+    back to a recent view is a dictionary lookup.
+    """
+    def __init__(self, pyramid, cache_size=TILE_CACHE_SIZE):
+        self.pyramid = pyramid
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def render(self, scale, canvas_w, canvas_h, tl_x, tl_y):
+        """PhotoImage of the visible region of the frame drawn at `scale` with its top-left at
+        (tl_x, tl_y) on the canvas -> (photo, x, y), or None when nothing is visible."""
+        iw, ih = self.pyramid.size
+        new_w = int(iw * scale)
+        new_h = int(ih * scale)
+
+        # Visible rectangle in canvas coords
+        vx0, vy0 = max(0, tl_x), max(0, tl_y)
+        vx1, vy1 = min(canvas_w, tl_x + new_w), min(canvas_h, tl_y + new_h)
+        if vx1 <= vx0 or vy1 <= vy0 or scale <= 0:
+            return None
+
+        key = (round(scale, 6), vx0 - tl_x, vy0 - tl_y, vx1 - vx0, vy1 - vy0)
+        photo = self.cache.get(key)
+        if photo is not None:
+            self.cache.move_to_end(key)
+            return photo, vx0, vy0
+
+        k = self.pyramid.level_for(scale)
+        level = self.pyramid.levels[k]
+        # Canvas -> level pixel coords
+        f = (iw / level.size[0]) * scale
+        box = ((vx0 - tl_x) / f, (vy0 - tl_y) / f, (vx1 - tl_x) / f, (vy1 - tl_y) / f)
+        img = level.resize((vx1 - vx0, vy1 - vy0), Image.Resampling.BILINEAR, box=box)
+
+        photo = ImageTk.PhotoImage(img)
+        self.cache[key] = photo
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return photo, vx0, vy0
+
+
+class RedrawStats:
+    """Rolling record of redraw draw times (ms) with percentile summaries.
+
+    Draw time runs from the start of the draw to its end, so it shows
+    whether FRAME_BUDGET_MS is met. The wait between the request and the
+    draw (mostly the deliberate coalescing delay) is kept apart as queue time.
+    """
+    def __init__(self, maxlen=2000):
+        self.samples = deque(maxlen=maxlen)
+        self.queued = deque(maxlen=maxlen)
+        self.coalesced = 0 # redraw requests absorbed by an already pending redraw
+
+    def timer(self):
+        return time.perf_counter()
+
+    def record(self, started, requested=None):
+        """`started` is when the draw began, `requested` when the redraw was asked for."""
+        self.samples.append((time.perf_counter() - started) * 1000)
+        if requested is not None:
+            self.queued.append((started - requested) * 1000)
+
+    def summary(self):
+        data = sorted(self.samples)
+        if not data:
+            return {"count": 0, "coalesced": self.coalesced}
+
+        def pct(values, p):
+            return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 3)
+
+        summary = {
+            "count": len(data),
+            "coalesced": self.coalesced,
+            "p50_ms": pct(data, 50),
+            "p90_ms": pct(data, 90),
+            "p99_ms": pct(data, 99),
+            "max_ms": round(data[-1], 3),
+            "over_budget": sum(1 for d in data if d > FRAME_BUDGET_MS),
+        }
+        queued = sorted(self.queued)
+        if queued:
+            summary["queue_p50_ms"] = pct(queued, 50)
+            summary["queue_p90_ms"] = pct(queued, 90)
+        return summary
+
+    def dump(self, path=None):
+        """Print the summary and optionally write it as JSON."""
+        summary = self.summary()
+        print(f"Redraw times: {summary}")
+        if path:
+            with open(path, "w") as f:
+                json.dump(summary, f, indent=2)
+        return summary
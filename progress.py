@@ -0,0 +1,107 @@
+import time
+import queue
+import threading
+from collections import deque
+
+POST_INTERVAL = 0.05 # frame counts are batched into at most one event per this many seconds
+FPS_WINDOW = 2.0 # seconds of frame events behind the displayed fps
+
+
+class ProgressChannel:
+    """Render -> UI progress events through a thread-safe queue.
+
+    The render side posts from any thread (frames() is cheap enough to call
+    per frame: counts are batched); the UI drains the queue on its own clock,
+    so nothing on the render path ever waits for Tk.
+    """
+    def __init__(self, interval=POST_INTERVAL):
+        self.events = queue.SimpleQueue()
+        self.interval = interval
+        self.pending = 0
+        self.last_post = 0.0
+        self.lock = threading.Lock()
+
+    def post(self, kind, **data):
+        self.events.put((kind, data))
+
+    def status(self, text):
+        self.post("status", text=text)
+
+    def frames(self, n=1):
+        """Count `n` rendered frames."""
+        with self.lock:
+            self.pending += n
+            now = time.perf_counter()
+            if now - self.last_post < self.interval: return
+            n, self.pending, self.last_post = self.pending, 0, now
+        self.post("frames", n=n, t=now)
+
+    def flush(self):
+        with self.lock:
+            n, self.pending = self.pending, 0
+        if n:
+            self.post("frames", n=n, t=time.perf_counter())
+
+    def drain(self):
+        """-> [(kind, data)] posted since the last drain."""
+        out = []
+        try:
+            while True:
+                out.append(self.events.get_nowait())
+        except queue.Empty:
+            return out
+
+
+class ProgressTracker:
+    """Folds drained events into a completed fraction, a sliding-window fps and an ETA."""
+    def __init__(self, window=FPS_WINDOW):
+        self.window = window
+        self.total = 0
+        self.done = 0
+        self.samples = deque() # (t, frames)
+        self.status = None
+        self.estimate = None # "estimate" event: predicted wall_s / bytes
+        self.summary = None # "summary" event: the render's telemetry summary
+
+    def apply(self, kind, data):
+        if kind == "plan":
+            self.total = data["frames"]
+            self.done = 0
+        elif kind == "frames":
+            self.done += data["n"]
+            self.samples.append((data["t"], data["n"]))
+        elif kind == "status":
+            self.status = data["text"]
+        elif kind == "estimate":
+            self.estimate = data
+        elif kind == "summary":
+            self.summary = data
+
+    @property
+    def fraction(self):
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+    @property
+    def fps(self):
+        now = time.perf_counter()
+        while self.samples and now - self.samples[0][0] > self.window:
+            self.samples.popleft()
+        if not self.samples: return 0.0
+        span = max(now - self.samples[0][0], 1e-3)
+        return sum(n for _, n in self.samples) / span
+
+    @property
+    def eta(self):
+        """Seconds left at the current fps, None while unknown."""
+        fps = self.fps
+        if not self.total or fps <= 0: return None
+        return max(0, self.total - self.done) / fps
+
+    def describe(self):
+        eta = self.eta
+        eta_txt = "--:--" if eta is None else f"{int(eta // 60):02d}:{int(eta % 60):02d}"
+        text = f"{self.fraction * 100:.0f}%  |  {self.fps:.1f} fps  |  ETA {eta_txt}"
+        if self.estimate:
+            est = self.estimate["wall_s"]
+            text += f"  |  est. {int(est // 60):02d}:{int(est % 60):02d}"
+        return text
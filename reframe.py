@@ -0,0 +1,145 @@
+import os
+import json
+
+import numpy as np
+
+import ffmpeg_tools
+from media_cache import analysis_source, atomic_write_json, cache_dir, cached_probe, source_key
+from scenes import cut_scores, detect_cuts
+
+ANALYSIS_FPS = 5 # subject positions sampled per second
+ANALYSIS_WIDTH = 160 # width of the luma frames the subject is found on
+SALIENCY_WEIGHT = 0.5 # edge energy (where detail is) relative to motion energy (what moves)
+SMOOTH_SECONDS = 0.8 # gaussian sigma of the camera path
+MAX_SPEED = 0.35 # fastest pan, in frame widths (heights) per second
+CHUNK_FRAMES = 256 # analysis frames read from ffmpeg per block
+REFRAME_VERSION = 1 # bump when the analysis changes, so cached paths are redone
+
+
+def subject_centres(frames, previous=None):
+    """Energy weighted centroid of each (n, h, w) uint8 luma frame -> (n, 2) (x, y) in 0..1.
+
+    Energy is the frame difference to the previous frame (motion) plus
+    gradient magnitude (a cheap saliency), with each frame's median taken
+    off so flat noise doesn't pull the centre. Frames without energy get NaN.
+    """
+    f = frames.astype(np.float32)
+    before = f[:1] if previous is None else previous[None].astype(np.float32)
+    motion = np.abs(f - np.concatenate([before, f[:-1]]))
+    grad = np.zeros_like(f)
+    grad[:, :, 1:] += np.abs(np.diff(f, axis=2))
+    grad[:, 1:, :] += np.abs(np.diff(f, axis=1))
+    energy = motion + SALIENCY_WEIGHT * grad
+    energy = np.maximum(energy - np.median(energy, axis=(1, 2), keepdims=True), 0)
+
+    n, h, w = energy.shape
+    total = energy.sum(axis=(1, 2))
+    xs = (np.arange(w) + 0.5) / w
+    ys = (np.arange(h) + 0.5) / h
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cx = (energy.sum(axis=1) * xs).sum(axis=1) / total
+        cy = (energy.sum(axis=2) * ys).sum(axis=1) / total
+    centres = np.stack([cx, cy], axis=1)
+    centres[total <= 1e-6] = np.nan
+    return centres
+
+
+def smooth_path(centres, cuts, fps):
+    """Camera path through `centres` that holds steady within a shot and jumps only at `cuts`.
+
+    Each shot is filled (missing samples take the shot mean), gaussian
+    smoothed, then limited to MAX_SPEED.
+    """
+    path = np.empty_like(centres)
+    bounds = [0] + [int(k) for k in cuts if 0 < k < len(centres)] + [len(centres)]
+    sigma = SMOOTH_SECONDS * fps
+    radius = max(1, int(3 * sigma))
+    kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    kernel /= kernel.sum()
+    step = MAX_SPEED / fps
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        if b <= a: continue
+        shot = centres[a:b].copy()
+        for axis in range(2):
+            col = shot[:, axis]
+            missing = np.isnan(col)
+            col[missing] = 0.5 if missing.all() else np.nanmean(col)
+            smoothed = np.convolve(np.pad(col, radius, mode="edge"), kernel, mode="valid")
+            # Speed limit: the camera follows, it never whips
+            for k in range(1, len(smoothed)):
+                smoothed[k] = smoothed[k - 1] + np.clip(smoothed[k] - smoothed[k - 1], -step, step)
+            path[a:b, axis] = smoothed
+    return path
+
+
+def _cache_entry(path):
+    return os.path.join(cache_dir("reframe"), f"{source_key(path)}-v{REFRAME_VERSION}.json")
+
+
+def subject_path(path, status=None, stop_event=None):
+    """Smoothed subject centre of `path` sampled at ANALYSIS_FPS -> [(x, y)] in 0..1 of the frame.
+
+    One decimated, downscaled pass (over the proxy when there is one);
+    shot cuts are detected in the same pass so the camera never drifts
+    across a cut. Cached per source: the path doesn't depend on the crop
+    box, which is fitted to it at render time (CropPath).
+    """
+    entry = _cache_entry(path)
+    if os.path.exists(entry):
+        try:
+            with open(entry) as f:
+                return json.load(f)["path"]
+        except (OSError, ValueError, KeyError): pass
+
+    if status:
+        status("Analyzing subject motion for auto reframe...")
+    src_w, src_h = cached_probe(path)["size"]
+    w = ANALYSIS_WIDTH
+    h = max(2, int(round(src_h * w / src_w / 2)) * 2)
+    args = ["-skip_loop_filter", "all", "-i", analysis_source(path), "-map", "0:v:0", "-an",
+            "-vf", f"fps={ANALYSIS_FPS},scale={w}:{h}:flags=area", "-pix_fmt", "gray", "-f", "rawvideo", "-"]
+    frame_bytes = w * h
+    centres, scores = [], []
+    last = None
+    for block in ffmpeg_tools.stream_ffmpeg(args, frame_bytes * CHUNK_FRAMES, stop_event):
+        frames = np.frombuffer(block, dtype=np.uint8, count=len(block) // frame_bytes * frame_bytes).reshape(-1, h, w)
+        centres.append(subject_centres(frames, last))
+        scores.append(cut_scores(frames if last is None else np.concatenate([last[None], frames])))
+        last = frames[-1]
+    if not centres:
+        return [[0.5, 0.5]]
+    scores = np.concatenate(scores)
+    # Score k sits between samples k and k + 1, so the new shot starts at k + 1
+    result = smooth_path(np.concatenate(centres), detect_cuts(scores, ANALYSIS_FPS) + 1, ANALYSIS_FPS)
+    result = np.round(result, 4).tolist()
+
+    atomic_write_json(entry, {"fps": ANALYSIS_FPS, "path": result})
+    return result
+
+
+class CropPath:
+    """Time-varying crop of a `box` (w, h) sized window following a subject_path() over a `src_size` frame.
+
+    Calling it with a full resolution frame and its source time returns
+    the window as a view (no copy). `period` wraps time for looped sources.
+    """
+    def __init__(self, path, src_size, box, period=None, fps=ANALYSIS_FPS):
+        self.src_size = src_size
+        w, h = src_size
+        self.box = (min(int(box[0]), w - w % 2), min(int(box[1]), h - h % 2))
+        self.period = period
+        centres = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+        self.times = np.arange(len(centres)) / fps
+        # Window top-left per sample in source pixels, clamped inside the frame
+        self.xs = np.clip(centres[:, 0] * w - self.box[0] / 2, 0, w - self.box[0])
+        self.ys = np.clip(centres[:, 1] * h - self.box[1] / 2, 0, h - self.box[1])
+
+    def offset_at(self, t):
+        if self.period:
+            t = t % self.period
+        return int(round(np.interp(t, self.times, self.xs))), int(round(np.interp(t, self.times, self.ys)))
+
+    def __call__(self, frame, t):
+        x, y = self.offset_at(t)
+        bw, bh = self.box
+        return frame[y:y + bh, x:x + bw]
@@ -0,0 +1,154 @@
+import os
+import json
+
+import numpy as np
+
+import ffmpeg_tools
+from media_cache import analysis_source, atomic_write_json, cache_dir, cached_probe, source_key
+
+ANALYSIS_FPS = 5 # frames per second the cut detector looks at
+ANALYSIS_SIZE = (64, 36) # luma thumbnails it compares
+HIST_BINS = 16
+CUT_THRESHOLD = 0.25 # combined score (0..1) a frame pair needs to count as a cut...
+CUT_CONTRAST = 3.0 # ...and how far it must stand out from the local median (fast motion scores high everywhere)
+LOCAL_WINDOW = 2.0 # seconds on each side of a frame pair for that median
+MIN_SHOT = 0.6 # seconds; a weaker cut closer than this to a stronger one is dropped
+SNAP_TOLERANCE = 2.0 # default distance a clip boundary may move to land on a cut
+CHUNK_FRAMES = 512 # analysis frames read from ffmpeg per block
+ANALYSIS_VERSION = 1 # bump when the detector changes, so cached cuts are redone
+
+
+def _frames(data, w, h):
+    frame_bytes = w * h
+    return np.frombuffer(data, dtype=np.uint8, count=len(data) // frame_bytes * frame_bytes).reshape(-1, h, w)
+
+
+def cut_scores(frames):
+    """Cut score of each consecutive pair of (n, h, w) uint8 luma frames -> (n - 1,) floats in 0..1.
+
+    Mean absolute difference catches cuts between shots of similar
+    exposure, histogram distance shrugs off motion inside a shot; the
+    score is the mean of both.
+    """
+    n = len(frames)
+    if n < 2: return np.zeros(0)
+    diff = np.abs(np.diff(frames.astype(np.int16), axis=0)).mean(axis=(1, 2)) / 255.0
+    # One bincount for every histogram: frame k's bins are offset by k * HIST_BINS
+    bins = frames.reshape(n, -1) // (256 // HIST_BINS) + (np.arange(n) * HIST_BINS)[:, None]
+    hist = np.bincount(bins.ravel(), minlength=n * HIST_BINS).reshape(n, HIST_BINS) / frames[0].size
+    hist_dist = 0.5 * np.abs(np.diff(hist, axis=0)).sum(axis=1)
+    return (diff + hist_dist) / 2
+
+
+def detect_cuts(scores, fps):
+    """Indices into `scores` that are cuts: above CUT_THRESHOLD, CUT_CONTRAST times the local
+    median, and the strongest within MIN_SHOT."""
+    if len(scores) == 0: return np.zeros(0, dtype=int)
+    windows = np.lib.stride_tricks.sliding_window_view
+    half = max(1, int(LOCAL_WINDOW * fps))
+    local = np.median(windows(np.pad(scores, half, mode="edge"), 2 * half + 1), axis=1)
+    gap = max(1, int(MIN_SHOT * fps))
+    peak = scores >= windows(np.pad(scores, gap), 2 * gap + 1).max(axis=1)
+    return np.flatnonzero((scores >= CUT_THRESHOLD) & (scores >= CUT_CONTRAST * local) & peak)
+
+
+def _cache_entry(path):
+    return os.path.join(cache_dir("scenes"), f"{source_key(path)}-v{ANALYSIS_VERSION}.json")
+
+
+def _load(entry):
+    if not os.path.exists(entry): return None
+    try:
+        with open(entry) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def scene_cuts(path, status=None, stop_event=None):
+    """Shot cut times of `path` in seconds (the first analysed frame of each new shot, so
+    accurate to 1 / ANALYSIS_FPS). Analysed once per source, then served from the cache.
+
+    The pass reads the source's proxy when one is built, decodes without
+    the deblocking filter and scales to ANALYSIS_SIZE luma inside ffmpeg,
+    so Python only ever sees a few KiB per analysed frame.
+    """
+    entry = _cache_entry(path)
+    data = _load(entry)
+    if data is not None:
+        return data["cuts"]
+
+    if status:
+        status("Analyzing scene cuts...")
+    w, h = ANALYSIS_SIZE
+    args = ["-skip_loop_filter", "all", "-i", analysis_source(path), "-map", "0:v:0", "-an",
+            "-vf", f"fps={ANALYSIS_FPS},scale={w}:{h}:flags=area", "-pix_fmt", "gray", "-f", "rawvideo", "-"]
+    scores = []
+    last = None
+    for block in ffmpeg_tools.stream_ffmpeg(args, w * h * CHUNK_FRAMES, stop_event):
+        frames = _frames(block, w, h)
+        if last is not None:
+            frames = np.concatenate([last[None], frames])
+        scores.append(cut_scores(frames))
+        last = frames[-1]
+    scores = np.concatenate(scores) if scores else np.zeros(0)
+    # Score k sits between analysed frames k and k + 1; the new shot is visible from k + 1 on
+    cuts = [round((k + 1) / ANALYSIS_FPS, 6) for k in detect_cuts(scores, ANALYSIS_FPS)]
+    atomic_write_json(entry, {"fps": ANALYSIS_FPS, "cuts": cuts, "refined": {}})
+    return cuts
+
+
+def refine_cut(path, coarse, source_fps):
+    """Frame exact time of a cut scene_cuts() placed at `coarse`: decodes the analysis
+    interval before it at the source frame rate and picks the strongest change."""
+    w, h = ANALYSIS_SIZE
+    frame_s = 1.0 / source_fps
+    lo = max(0.0, coarse - 1.0 / ANALYSIS_FPS - frame_s)
+    args = ["-ss", f"{lo:.6f}", "-i", analysis_source(path), "-t", f"{coarse - lo + frame_s:.6f}",
+            "-map", "0:v:0", "-an", "-vf", f"scale={w}:{h}:flags=area", "-pix_fmt", "gray", "-f", "rawvideo", "-"]
+    try:
+        frames = _frames(ffmpeg_tools.pipe_ffmpeg(args), w, h)
+    except RuntimeError:
+        return coarse
+    if len(frames) < 2: return coarse
+    return round(lo + (int(np.argmax(cut_scores(frames))) + 1) * frame_s, 6)
+
+
+def snap_ranges(ranges, cuts, tolerance):
+    """Move each clip boundary to the nearest of `cuts` within `tolerance` seconds.
+
+    Boundaries are snapped as values, so clips that meet keep meeting.
+    """
+    if not cuts or tolerance <= 0 or not ranges: return list(ranges)
+    cuts = np.asarray(cuts, dtype=float)
+    bounds = np.asarray(ranges, dtype=float)
+    idx = np.searchsorted(cuts, bounds)
+    left = cuts[np.clip(idx - 1, 0, len(cuts) - 1)]
+    right = cuts[np.clip(idx, 0, len(cuts) - 1)]
+    nearest = np.where(np.abs(bounds - left) <= np.abs(right - bounds), left, right)
+    snapped = np.where(np.abs(nearest - bounds) <= tolerance, nearest, bounds)
+    return [(float(start), float(end)) for start, end in snapped]
+
+
+def snap_to_cuts(path, ranges, tolerance=SNAP_TOLERANCE, status=None, stop_event=None):
+    """`ranges` with every boundary on the nearest shot cut within `tolerance` seconds, frame exact.
+
+    Only the cuts a boundary actually lands on are refined (refine_cut);
+    those are cached next to the analysis too.
+    """
+    cuts = scene_cuts(path, status, stop_event)
+    snapped = snap_ranges(ranges, cuts, tolerance)
+    used = {t for r in snapped for t in r} & set(cuts)
+    if not used: return snapped
+
+    entry = _cache_entry(path)
+    data = _load(entry) or {"fps": ANALYSIS_FPS, "cuts": cuts, "refined": {}}
+    refined = data.setdefault("refined", {})
+    missing = [t for t in sorted(used) if f"{t:.6f}" not in refined]
+    if missing:
+        source_fps = cached_probe(path)["fps"] or 30.0
+        for t in missing:
+            refined[f"{t:.6f}"] = refine_cut(path, t, source_fps)
+        atomic_write_json(entry, data)
+    exact = {t: refined[f"{t:.6f}"] for t in used}
+    return [(exact.get(start, start), exact.get(end, end)) for start, end in snapped]
@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from datetime import datetime
+
+from media_cache import atomic_write_json
+
+CLIPS_FILE = "clips.jsonl" # one line per rendered clip
+RUNS_FILE = "runs.jsonl" # one summary line per render() call
+SUMMARY_FILE = "summary.json" # summary of the latest run, overwritten
+
+
+def telemetry_dir():
+    """Where render telemetry goes (override with PROCLIP_TELEMETRY_DIR)."""
+    path = os.environ.get("PROCLIP_TELEMETRY_DIR") or os.path.join(os.path.expanduser("~"), ".proclipstudio", "telemetry")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _windows_peak_rss():
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    kernel32, psapi = ctypes.windll.kernel32, ctypes.windll.psapi
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD]
+    counters = Counters()
+    counters.cb = ctypes.sizeof(Counters)
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def peak_rss():
+    """-> (peak RSS of this process, peak RSS of its largest finished child) in bytes.
+
+    Children are the ffmpeg encoders; Windows has no cheap equivalent for
+    them, so that value is None there.
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            return _windows_peak_rss(), None
+        except (OSError, AttributeError):
+            return None, None
+    scale = 1 if sys.platform == "darwin" else 1024 # ru_maxrss is bytes on macOS, KiB on Linux
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+class StageTimer:
+    """Exclusive wall time per pipeline stage.
+
+    Stages nest the way MoviePy pulls frames (resize calls crop calls
+    decode), so each call's own time is its elapsed time minus that of the
+    stages it called.
+    """
+    def __init__(self):
+        self.totals = {}
+        self.stack = []
+
+    def call(self, stage, fn, *args):
+        self.stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            child = self.stack.pop()
+            self.totals[stage] = self.totals.get(stage, 0.0) + elapsed - child
+            if self.stack:
+                self.stack[-1] += elapsed
+
+    def snapshot(self):
+        return dict(self.totals)
+
+    def since(self, snapshot):
+        """Per-stage time spent after `snapshot` was taken."""
+        return {k: v - snapshot.get(k, 0.0) for k, v in self.totals.items() if v - snapshot.get(k, 0.0) > 0}
+
+
+def clip_record(wall, frames, stages, out_file, rest="encode"):
+    """Per-clip measurements. Whatever `stages` doesn't cover is booked to `rest`
+    (x264 and muxing, which run in the ffmpeg child)."""
+    stages = {k: round(v, 4) for k, v in stages.items()}
+    stages[rest] = round(max(0.0, wall - sum(stages.values())), 4)
+    rss, child_rss = peak_rss()
+    return {
+        "wall_s": round(wall, 4),
+        "frames": frames,
+        "fps": round(frames / wall, 2) if wall > 0 else None,
+        "stages": stages,
+        "peak_rss_bytes": rss,
+        "peak_child_rss_bytes": child_rss,
+        "bytes": os.path.getsize(out_file) if os.path.exists(out_file) else None,
+    }
+
+
+class RenderTelemetry:
+    """JSON Lines record of every clip of one render() call, plus a run summary.
+
+    `directory` None keeps it in memory only: the summary is still built
+    (render() posts it as progress), but nothing is written to disk.
+    """
+    def __init__(self, directory, job, pipeline="moviepy"):
+        self.directory = directory
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.source = job.video_path
+        self.settings = {"resolution": job.resolution, "fps": job.fps, "audio_mode": job.audio_mode,
+                         "crop": job.crop is not None, "encoder": job.encoder}
+        self.pipeline = pipeline
+        self.clips = []
+        self.skipped = 0
+        self.failed = 0
+        self.cancel = None # {"abort_to_idle_s", "partial_files"} when the run was aborted
+        self.estimate = None # estimate.estimate_render() result the run is compared against
+        self.lock = threading.Lock()
+
+    def record(self, clip, start, end, out_file, record):
+        entry = {"run_id": self.run_id, "source": self.source, "pipeline": self.pipeline, "clip": clip,
+                 "start": start, "end": end, "file": os.path.basename(out_file), **record}
+        predicted = self._predicted(clip)
+        if predicted is not None:
+            entry["estimated_wall_s"], entry["estimated_bytes"] = predicted["wall_s"], predicted["bytes"]
+        with self.lock:
+            self.clips.append(entry)
+            if self.directory is None: return
+            with open(os.path.join(self.directory, CLIPS_FILE), "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def _predicted(self, clip):
+        if self.estimate is None: return None
+        return next((c for c in self.estimate["clips"] if c["clip"] == clip), None)
+
+    def summary(self):
+        wall = time.perf_counter() - self.started
+        frames = sum(c["frames"] or 0 for c in self.clips)
+        stages = {}
+        for c in self.clips:
+            for k, v in c["stages"].items():
+                stages[k] = round(stages.get(k, 0.0) + v, 4)
+        peaks = [c["peak_rss_bytes"] for c in self.clips if c["peak_rss_bytes"]]
+        child_peaks = [c["peak_child_rss_bytes"] for c in self.clips if c["peak_child_rss_bytes"]]
+        estimate = None
+        if self.estimate is not None:
+            bytes_written = sum(c["bytes"] or 0 for c in self.clips)
+            estimate = {k: self.estimate[k] for k in ("mode", "workers", "wall_s", "raw_wall_s", "bytes", "frames")}
+            estimate["wall_error"] = round(wall / self.estimate["wall_s"] - 1, 4) if self.estimate["wall_s"] else None
+            estimate["bytes_error"] = round(bytes_written / self.estimate["bytes"] - 1, 4) if self.estimate["bytes"] else None
+        return {
+            "run_id": self.run_id,
+            "started": self.started_at,
+            "source": self.source,
+            "pipeline": self.pipeline,
+            "settings": self.settings,
+            "clips": len(self.clips),
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "frames": frames,
+            "wall_s": round(wall, 3),
+            "fps": round(frames / wall, 2) if wall > 0 and frames else None,
+            "stages": stages,
+            "peak_rss_bytes": max(peaks) if peaks else None,
+            "peak_child_rss_bytes": max(child_peaks) if child_peaks else None,
+            "bytes": sum(c["bytes"] or 0 for c in self.clips),
+            "cancel": self.cancel,
+            "estimate": estimate,
+        }
+
+    def finish(self):
+        summary = self.summary()
+        if self.directory is None: return summary
+        with open(os.path.join(self.directory, RUNS_FILE), "a") as f:
+            f.write(json.dumps(summary) + "\n")
+        atomic_write_json(os.path.join(self.directory, SUMMARY_FILE), summary, indent=2)
+        return summary